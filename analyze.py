@@ -1,28 +1,27 @@
 """Ascension Ads Analytics — CLI entry point."""
 
+import contextlib
 import os
-import sys
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 
 import click
-import pandas as pd
-import yaml
-
-from src.ingest.search_terms import load_search_term_report
-from src.ingest.targeting import (
-    build_targeting_from_search_terms, load_targeting_reports,
-    build_bid_lookup, build_supplemental_targeting, enrich_with_bids,
-    DATA_SOURCE_SEARCH_TERMS,
+
+# Analysis, ingest and report modules (and pandas/yaml behind them) are imported
+# inside the commands that use them, so `trends` and `lifetime` start quickly.
+
+# Rows per chunk when streaming search term CSVs
+SEARCH_TERM_CHUNKSIZE = 100_000
+
+# Panel body for the `lifetime` command, filled from get_lifetime_summary()
+_LIFETIME_TPL = (
+    "Weeks tracked: {weeks_tracked}\n"
+    "Total spend: ${total_spend:.2f}\n"
+    "Total orders: {total_orders}\n"
+    "Total sales: ${total_sales:.2f}\n"
+    "Overall ACoS: {overall_acos_pct:.1f}%\n"
+    "Overall ROAS: {overall_roas:.2f}x\n"
+    "Avg weekly spend: ${avg_weekly_spend:.2f}\n"
 )
-from src.ingest.kdp import load_kdp_report, load_kdp_orders
-from src.analysis.campaign_summary import generate_campaign_summary
-from src.analysis.asin_performance import analyze_asin_targets
-from src.analysis.keyword_performance import analyze_keywords
-from src.analysis.search_terms import analyze_search_terms, apply_asin_resolution
-from src.analysis.kdp_reconciliation import reconcile_kdp_sales
-from src.analysis.bid_recommendations import recommend_bids
-from src.reports.terminal import render_full_report
-from src.reports.markdown import write_weekly_report
 
 
 def load_config(config_path: str = "config/campaigns.yaml") -> dict:
@@ -32,8 +31,12 @@ def load_config(config_path: str = "config/campaigns.yaml") -> dict:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         config_path = os.path.join(base_dir, config_path)
 
+    import yaml
+
+    # Prefer the libyaml-backed C loader when PyYAML was built with it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     with open(config_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=loader)
 
 
 @click.group()
@@ -66,23 +69,42 @@ def cli():
 def report(week, search_terms_paths, kdp_paths, targeting_paths,
            config_path, resolve_asins, save, no_terminal, output_dir):
     """Generate a weekly performance report from CSV/XLSX exports."""
+    import pandas as pd
+    from src.ingest.search_terms import load_search_term_report
+    from src.ingest.targeting import (
+        build_targeting_from_search_terms, load_targeting_reports,
+        build_bid_lookup, build_supplemental_targeting, enrich_with_bids,
+        DATA_SOURCE_SEARCH_TERMS,
+    )
+    from src.ingest.kdp import load_kdp_report, load_kdp_orders, open_kdp_workbook
+    from src.analysis.campaign_summary import generate_campaign_summary
+    from src.analysis.asin_performance import analyze_asin_targets
+    from src.analysis.keyword_performance import analyze_keywords
+    from src.analysis.search_terms import analyze_search_terms, apply_asin_resolution
+    from src.analysis.kdp_reconciliation import reconcile_kdp_sales
+    from src.analysis.bid_recommendations import recommend_bids
+    from src.reports.markdown import write_weekly_report
+    from src.utils.config_index import build_config_index
+
     config = load_config(config_path)
+    config_index = build_config_index(config)
 
     # --week is the pull date; report covers the 7 days before it
-    pull_date = datetime.strptime(week, "%Y-%m-%d")
-    week_end = pull_date - timedelta(days=1)
-    week_start = pull_date - timedelta(days=7)
-    week_start_str = week_start.strftime("%Y-%m-%d")
-    week_end_str = week_end.strftime("%Y-%m-%d")
+    pull_date = date.fromisoformat(week)
+    week_start_str = (pull_date - timedelta(days=7)).isoformat()
+    week_end_str = (pull_date - timedelta(days=1)).isoformat()
 
     click.echo(f"Pull date: {week} — reporting period: {week_start_str} to {week_end_str}")
 
-    # Ingest search term reports (may be multiple files for different date ranges)
+    # Ingest search term reports (may be multiple files for different date ranges).
+    # CSVs are streamed in chunks, then concatenated once for deduplication.
     search_term_frames = []
     for path in search_terms_paths:
-        df = load_search_term_report(path)
-        search_term_frames.append(df)
-        click.echo(f"  Search terms ({os.path.basename(path)}): {len(df)} rows")
+        rows = 0
+        for chunk in load_search_term_report(path, chunksize=SEARCH_TERM_CHUNKSIZE):
+            rows += len(chunk)
+            search_term_frames.append(chunk)
+        click.echo(f"  Search terms ({os.path.basename(path)}): {rows} rows")
 
     search_term_df = pd.concat(search_term_frames, ignore_index=True) if search_term_frames else pd.DataFrame()
 
@@ -153,10 +175,12 @@ def report(week, search_terms_paths, kdp_paths, targeting_paths,
     kdp_frames = []
     kdp_orders_frames = []
     for path in kdp_paths:
-        df = load_kdp_report(path)
+        # Royalty and order sheets come from the same workbook: parse it once
+        with open_kdp_workbook(path) or contextlib.nullcontext() as xls:
+            df = load_kdp_report(path, xls=xls)
+            odf = load_kdp_orders(path, xls=xls)
         kdp_frames.append(df)
         click.echo(f"  KDP sales ({os.path.basename(path)}): {len(df)} rows")
-        odf = load_kdp_orders(path)
         if not odf.empty:
             kdp_orders_frames.append(odf)
             click.echo(f"  KDP daily orders ({os.path.basename(path)}): {len(odf)} rows")
@@ -228,16 +252,19 @@ def report(week, search_terms_paths, kdp_paths, targeting_paths,
     asin_performance = analyze_asin_targets(
         targeting_df, config, bid_lookup=bid_lookup,
         targeting_report_df=targeting_report_df,
+        config_index=config_index,
     )
-    keyword_performance = analyze_keywords(targeting_df, config)
+    keyword_performance = analyze_keywords(targeting_df, config, config_index=config_index)
     search_term_analysis = analyze_search_terms(search_term_df, config)
+    bid_recs = recommend_bids(targeting_df, config)
+
     kdp_recon = reconcile_kdp_sales(
         kdp_df, campaign_summary, week_start_str, week_end_str,
         kdp_orders_df=kdp_orders_df, config=config,
         cumulative_prior_spend=cumulative_prior_spend,
         cumulative_kdp_df=cumulative_kdp_df,
+        config_index=config_index,
     )
-    bid_recs = recommend_bids(targeting_df, config)
 
     # Resolve ASIN search terms to book titles
     if resolve_asins:
@@ -256,6 +283,8 @@ def report(week, search_terms_paths, kdp_paths, targeting_paths,
 
     # Terminal output
     if not no_terminal:
+        from src.reports.terminal import render_full_report
+
         render_full_report(
             week=week,
             campaign_summary=campaign_summary,
@@ -313,6 +342,7 @@ def report(week, search_terms_paths, kdp_paths, targeting_paths,
 @click.option("--weeks", default=8, type=int, help="Number of weeks to show")
 def trends(metric, campaign, weeks):
     """Show metric trends over time (requires saved snapshots)."""
+    import pandas as pd
     try:
         from src.storage.snapshots import get_trend_data
         from rich.console import Console
@@ -334,21 +364,21 @@ def trends(metric, campaign, weeks):
                 if col != "week_start":
                     table.add_column(col)
 
-        for _, row in data.iterrows():
-            values = [row["week_start"]]
-            for col in data.columns:
-                if col != "week_start":
-                    val = row[col]
-                    if val is None or pd.isna(val):
-                        values.append("—")
-                    elif metric in ("ctr", "acos"):
-                        values.append(f"{val * 100:.2f}%")
-                    elif metric in ("spend",):
-                        values.append(f"${val:.2f}")
-                    elif metric in ("roas",):
-                        values.append(f"{val:.2f}x")
-                    else:
-                        values.append(str(int(val)))
+        fmt = {
+            "ctr": lambda v: f"{v * 100:.2f}%",
+            "acos": lambda v: f"{v * 100:.2f}%",
+            "spend": lambda v: f"${v:.2f}",
+            "roas": lambda v: f"{v:.2f}x",
+        }.get(metric, lambda v: str(int(v)))
+
+        cols = list(data.columns)
+        week_idx = cols.index("week_start")
+        value_idx = [j for j, col in enumerate(cols) if col != "week_start"]
+        for row in data.itertuples(index=False, name=None):
+            values = [row[week_idx]]
+            for j in value_idx:
+                val = row[j]
+                values.append("—" if val is None or pd.isna(val) else fmt(val))
             table.add_row(*values)
 
         console.print(table)
@@ -372,14 +402,8 @@ def lifetime():
             click.echo("No historical data found. Run 'report --save' first.")
             return
 
-        text = (
-            f"Weeks tracked: {summary['weeks_tracked']}\n"
-            f"Total spend: ${summary['total_spend']:.2f}\n"
-            f"Total orders: {summary['total_orders']}\n"
-            f"Total sales: ${summary['total_sales']:.2f}\n"
-            f"Overall ACoS: {summary['overall_acos'] * 100:.1f}%\n"
-            f"Overall ROAS: {summary['overall_roas']:.2f}x\n"
-            f"Avg weekly spend: ${summary['avg_weekly_spend']:.2f}\n"
+        text = _LIFETIME_TPL.format_map(
+            {**summary, "overall_acos_pct": summary["overall_acos"] * 100}
         )
         console.print(Panel(text, title="Lifetime Campaign Summary"))
 
@@ -400,7 +424,7 @@ def resolve_asins_cmd(lookup_path):
     with Google fallback.
     """
     from src.utils.asin_resolver import (
-        is_asin, retry_unknown_asins, _load_lookup, _DEFAULT_LOOKUP_PATH,
+        is_asin, retry_unknown_asins, _load_lookup_with_index, _DEFAULT_LOOKUP_PATH,
     )
 
     if lookup_path is None:
@@ -409,8 +433,7 @@ def resolve_asins_cmd(lookup_path):
         )
 
     # Load current lookup to find what's already resolved
-    lookup = _load_lookup(lookup_path)
-    lookup_lower = {k.lower() for k in lookup}
+    lookup, lookup_lower = _load_lookup_with_index(lookup_path)
 
     # Pull distinct search terms from the database
     try:
@@ -419,7 +442,6 @@ def resolve_asins_cmd(lookup_path):
         rows = conn.execute(
             "SELECT DISTINCT search_term FROM search_term_metrics"
         ).fetchall()
-        conn.close()
         all_terms = [r[0] for r in rows]
     except Exception as e:
         click.echo(f"Could not read database: {e}", err=True)
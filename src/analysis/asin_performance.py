@@ -1,7 +1,8 @@
 """ASIN target performance analysis with flags."""
 
 import pandas as pd
-import yaml
+
+from src.utils.config_index import build_config_index
 
 
 def analyze_asin_targets(
@@ -9,6 +10,7 @@ def analyze_asin_targets(
     config: dict,
     bid_lookup: dict = None,
     targeting_report_df: pd.DataFrame = None,
+    config_index: dict = None,
 ) -> dict:
     """Analyze ASIN-targeting campaign performance.
 
@@ -20,6 +22,10 @@ def analyze_asin_targets(
         config: Parsed campaigns.yaml config dict.
         bid_lookup: Optional dict from build_bid_lookup() — maps targeting
             to bid/suggested bid data from targeting reports.
+        targeting_report_df: Optional targeting report DataFrame, used for
+            lifetime impressions on zero-activity targets.
+        config_index: Optional output of build_config_index(); built from
+            config when not supplied.
 
     Returns:
         dict with keys:
@@ -34,66 +40,65 @@ def analyze_asin_targets(
     high_spend_threshold = settings.get("high_spend_flag", 5.0)
     low_impressions_threshold = settings.get("low_impressions_flag", 10)
 
-    # Filter to product targeting campaigns
-    asin_campaigns = []
-    for key, campaign in config.get("campaigns", {}).items():
-        if campaign.get("type") == "product_targeting":
-            asin_campaigns.append(campaign["name"])
-
-    df = targeting_df[targeting_df["campaign_name"].isin(asin_campaigns)].copy()
-
-    # Build lookup from config targets (product_targeting campaigns only)
-    target_lookup = {}
-    for key, campaign in config.get("campaigns", {}).items():
-        if campaign.get("type") != "product_targeting":
-            continue
-        for target in campaign.get("targets", []):
-            # Use ASIN as key; if multiple entries (exact+expanded), last wins
-            target_lookup[target["asin"]] = {
-                "title": target.get("title", ""),
-                "campaign_key": key,
-            }
+    if config_index is None:
+        config_index = build_config_index(config)
+    asin_campaigns = config_index["asin_campaigns"]
+    target_lookup = config_index["target_lookup"]
+
+    # Filter to product targeting campaigns (no defensive copy: new columns are
+    # added via assign and the sort below yields a fresh frame)
+    df = targeting_df.loc[targeting_df["campaign_name"].isin(asin_campaigns)]
 
     flags = []
     zero_activity_targets = []
 
     if not df.empty:
-        # Enrich with config data
-        df["target_title"] = df["targeting"].map(
-            lambda x: target_lookup.get(x, {}).get("title", "")
+        # Enrich with config data (single hash join against an ASIN-indexed lookup)
+        title_lookup = pd.Series(
+            {asin: info["title"] for asin, info in target_lookup.items()}, dtype=object
         )
-
-        # Compute derived metrics
-        df["conversion_rate"] = df.apply(
-            lambda r: r["orders"] / r["clicks"] if r["clicks"] > 0 else 0,
-            axis=1,
+        df = df.assign(
+            target_title=title_lookup.reindex(df["targeting"].to_numpy()).fillna("").to_numpy(),
+            conversion_rate=df["orders"].div(df["clicks"].where(df["clicks"] > 0)).fillna(0),
         )
 
         # Sort by spend descending
-        df = df.sort_values("spend", ascending=False).reset_index(drop=True)
-
-        # Generate flags for targets with data
-        for _, row in df.iterrows():
-            target_id = row["targeting"]
-            title = row["target_title"] or target_id
-
-            if row["spend"] > high_spend_threshold and row["orders"] == 0:
-                flags.append({
-                    "type": "high_spend_no_orders",
-                    "severity": "warning",
-                    "target": target_id,
-                    "title": title,
-                    "message": f"${row['spend']:.2f} spent with 0 orders",
-                })
-
-            if row["impressions"] < low_impressions_threshold:
-                flags.append({
-                    "type": "underserving",
-                    "severity": "info",
-                    "target": target_id,
-                    "title": title,
-                    "message": f"Only {row['impressions']} impressions (bid may be too low)",
-                })
+        df = df.sort_values("spend", ascending=False, ignore_index=True)
+
+        # Generate flags for targets with data. Masks are computed column-wise
+        # and each flag type is assembled as a frame; a stable sort on row
+        # position keeps each target's flags together, as in the report.
+        high_spend = (df["spend"] > high_spend_threshold) & (df["orders"] == 0)
+        underserving = df["impressions"] < low_impressions_threshold
+        targets = pd.DataFrame({
+            "target": df["targeting"].astype(object),
+            "title": df["target_title"].where(
+                df["target_title"].astype(bool), df["targeting"].astype(object)
+            ),
+        })
+        high_spend_flags = targets[high_spend].assign(
+            type="high_spend_no_orders",
+            severity="warning",
+            message=[f"${v:.2f} spent with 0 orders" for v in df.loc[high_spend, "spend"].tolist()],
+            kind_order=0,
+        )
+        underserving_flags = targets[underserving].assign(
+            type="underserving",
+            severity="info",
+            message=[
+                f"Only {v} impressions (bid may be too low)"
+                for v in df.loc[underserving, "impressions"].tolist()
+            ],
+            kind_order=1,
+        )
+        row_flags = (
+            pd.concat([high_spend_flags, underserving_flags])
+            .rename_axis("row")
+            .sort_values(["row", "kind_order"], kind="stable")
+        )
+        flags.extend(
+            row_flags[["type", "severity", "target", "title", "message"]].to_dict(orient="records")
+        )
 
     # Build lifetime impression lookup from targeting reports (if available)
     lifetime_impressions = {}
@@ -106,33 +111,37 @@ def analyze_asin_targets(
 
     # Detect zero-activity targets: configured but absent from targeting data
     # Targets may now appear in df via supplemental targeting report data
-    active_asins = set(df["targeting"].unique()) if not df.empty else set()
-    for asin, info in target_lookup.items():
-        if asin not in active_asins:
-            bid_data = bid_lookup.get(asin, {})
-            lt_impr = lifetime_impressions.get(asin, 0)
-            zero_activity_targets.append({
-                "asin": asin,
-                "title": info["title"],
-                "bid": bid_data.get("bid"),
-                "lifetime_impressions": lt_impr,
-            })
-            if lt_impr > 0:
-                msg = (
-                    f"{info['title'] or asin} ({asin}): "
-                    f"No search term activity — {lt_impr:,} lifetime impressions, 0 clicks"
-                )
-            else:
-                msg = (
-                    f"{info['title'] or asin} ({asin}): "
-                    f"No impressions this week"
-                )
-            flags.append({
-                "type": "zero_activity",
-                "severity": "info",
-                "target": asin,
-                "title": info["title"] or asin,
-                "message": msg,
-            })
+    # Missing targets are selected with isin so they keep config order
+    # (Index.difference would sort them)
+    configured = pd.Index(list(target_lookup), dtype=object)
+    if not df.empty:
+        configured = configured[~configured.isin(df["targeting"].unique())]
+    for asin in configured:
+        info = target_lookup[asin]
+        bid_data = bid_lookup.get(asin, {})
+        lt_impr = lifetime_impressions.get(asin, 0)
+        zero_activity_targets.append({
+            "asin": asin,
+            "title": info["title"],
+            "bid": bid_data.get("bid"),
+            "lifetime_impressions": lt_impr,
+        })
+        if lt_impr > 0:
+            msg = (
+                f"{info['title'] or asin} ({asin}): "
+                f"No search term activity — {lt_impr:,} lifetime impressions, 0 clicks"
+            )
+        else:
+            msg = (
+                f"{info['title'] or asin} ({asin}): "
+                f"No impressions this week"
+            )
+        flags.append({
+            "type": "zero_activity",
+            "severity": "info",
+            "target": asin,
+            "title": info["title"] or asin,
+            "message": msg,
+        })
 
     return {"table": df, "flags": flags, "zero_activity_targets": zero_activity_targets}
@@ -1,8 +1,20 @@
 """Bid recommendations based on conversion rates and profitability."""
 
+import numpy as np
 import pandas as pd
 
 
+# Flag names indexed by the classifier codes in recommend_bids (0 = no flag)
+_FLAG_TYPES = (
+    None,
+    "no_data",
+    "impressions_no_clicks",
+    "no_conversions",
+    "bid_above_profitable",
+    "bid_below_range",
+)
+
+
 def recommend_bids(
     targeting_df: pd.DataFrame,
     config: dict,
@@ -32,134 +44,130 @@ def recommend_bids(
     if target_acos <= 0:
         target_acos = 0.50
 
-    df = targeting_df.copy()
+    # Read-only from here on: derived values live in arrays and the output
+    # table is assembled from just the columns it keeps
+    df = targeting_df
 
     if df.empty:
         return {"table": pd.DataFrame(), "flags": []}
 
     # Compute conversion rate
-    df["conversion_rate"] = df.apply(
-        lambda r: r["orders"] / r["clicks"] if r["clicks"] > 0 else 0,
-        axis=1,
+    clicks = df["clicks"].to_numpy(dtype="float64")
+    conversion_rate = np.divide(
+        df["orders"].to_numpy(dtype="float64"), clicks,
+        out=np.zeros(len(df)), where=clicks > 0,
     )
 
-    # Calculate max profitable bid
+    # Calculate max profitable bid (NaN where there are no conversions)
     # max_bid = blended_royalty * conversion_rate / target_acos
-    df["max_profitable_bid"] = df["conversion_rate"].apply(
-        lambda cr: (blended_royalty * cr / target_acos) if cr > 0 else None
+    max_bids = np.where(
+        conversion_rate > 0, blended_royalty * conversion_rate / target_acos, np.nan
     )
 
     # Current bid and suggested bid (from targeting report enrichment)
     has_bid = "bid" in df.columns
     has_suggested = "suggested_bid_median" in df.columns
 
-    # Generate flags
+    # Generate flags. Each row gets at most one flag; the branch is picked with
+    # column-wise masks and only the flagged rows are visited.
+    impressions = df["impressions"].to_numpy()
+    click_counts = df["clicks"].to_numpy()
+    orders = df["orders"].to_numpy() if "orders" in df.columns else np.zeros(len(df))
+    current_bids = (
+        df["bid"].to_numpy(dtype="float64", na_value=np.nan) if has_bid
+        else np.full(len(df), np.nan)
+    )
+    suggested_bids = (
+        df["suggested_bid_median"].to_numpy(dtype="float64", na_value=np.nan) if has_suggested
+        else np.full(len(df), np.nan)
+    )
+
+    no_clicks = clicks == 0
+    converting = ~no_clicks & (orders != 0)
+    comparable = converting & ~np.isnan(current_bids) & ~np.isnan(max_bids)
+    above = comparable & (current_bids > max_bids)
+    # Classify into small integer codes (0 = no flag); names are looked up
+    # only for flagged rows instead of materializing a string per row
+    kind = np.select(
+        [
+            no_clicks & (impressions == 0),
+            no_clicks,
+            ~no_clicks & (orders == 0),
+            above,
+            comparable & ~above & (current_bids < max_bids * 0.5),
+        ],
+        np.arange(1, len(_FLAG_TYPES), dtype=np.int8),
+        default=0,
+    )
+
+    flagged = np.flatnonzero(kind)
+    targets = df["targeting"].to_numpy()[flagged].tolist()
+    campaigns = (
+        df["campaign_name"].to_numpy()[flagged].tolist() if "campaign_name" in df.columns
+        else [""] * len(flagged)
+    )
+
     flags = []
-    for _, row in df.iterrows():
-        target = row["targeting"]
-        campaign = row.get("campaign_name", "")
-        current_bid = row.get("bid") if has_bid and pd.notna(row.get("bid")) else None
-        suggested_bid = row.get("suggested_bid_median") if has_suggested and pd.notna(row.get("suggested_bid_median")) else None
-        max_bid = row.get("max_profitable_bid")
-        clicks = row.get("clicks", 0)
-
-        if clicks == 0:
-            impr = row.get("impressions", 0)
-            if impr == 0:
-                flags.append({
-                    "type": "no_data",
-                    "severity": "info",
-                    "target": target,
-                    "campaign": campaign,
-                    "current_bid": current_bid,
-                    "suggested_bid": suggested_bid,
-                    "recommended_bid": None,
-                    "message": "No impressions or clicks — insufficient data for bid recommendation",
-                })
-            else:
-                flags.append({
-                    "type": "impressions_no_clicks",
-                    "severity": "info",
-                    "target": target,
-                    "campaign": campaign,
-                    "current_bid": current_bid,
-                    "suggested_bid": suggested_bid,
-                    "recommended_bid": None,
-                    "message": (
-                        f"{impr:,} impressions but 0 clicks — "
-                        "ad is showing but not generating engagement"
-                    ),
-                })
-            continue
-
-        if row.get("orders", 0) == 0:
-            flags.append({
-                "type": "no_conversions",
-                "severity": "info",
-                "target": target,
-                "campaign": campaign,
-                "current_bid": current_bid,
-                "suggested_bid": suggested_bid,
-                "recommended_bid": None,
-                "message": (
-                    f"{clicks} clicks but 0 orders — no conversion data yet. "
-                    "Consider lowering bid or pausing if trend continues."
-                ),
-            })
-            continue
-
-        if current_bid is not None and max_bid is not None:
-            if current_bid > max_bid:
+    for target, campaign, flag_type, i in zip(
+        targets, campaigns, [_FLAG_TYPES[k] for k in kind[flagged].tolist()], flagged.tolist()
+    ):
+        current_bid = None if np.isnan(current_bids[i]) else current_bids[i].item()
+        suggested_bid = None if np.isnan(suggested_bids[i]) else suggested_bids[i].item()
+        severity = "info"
+        recommended_bid = None
+
+        if flag_type == "no_data":
+            msg = "No impressions or clicks — insufficient data for bid recommendation"
+        elif flag_type == "impressions_no_clicks":
+            msg = (
+                f"{impressions[i].item():,} impressions but 0 clicks — "
+                "ad is showing but not generating engagement"
+            )
+        elif flag_type == "no_conversions":
+            msg = (
+                f"{click_counts[i].item()} clicks but 0 orders — no conversion data yet. "
+                "Consider lowering bid or pausing if trend continues."
+            )
+        else:
+            max_bid = max_bids[i].item()
+            recommended_bid = max_bid
+            if flag_type == "bid_above_profitable":
+                severity = "warning"
                 msg = f"Current bid ${current_bid:.2f} exceeds max profitable bid ${max_bid:.2f} at {target_acos:.0%} ACoS target"
-                if suggested_bid:
-                    msg += f" (Amazon suggests ${suggested_bid:.2f})"
-                flags.append({
-                    "type": "bid_above_profitable",
-                    "severity": "warning",
-                    "target": target,
-                    "campaign": campaign,
-                    "current_bid": current_bid,
-                    "suggested_bid": suggested_bid,
-                    "recommended_bid": max_bid,
-                    "message": msg,
-                })
-            elif current_bid < max_bid * 0.5:
+            else:
                 msg = (
                     f"Current bid ${current_bid:.2f} is well below max profitable "
                     f"bid ${max_bid:.2f} — room to increase for more impressions"
                 )
-                if suggested_bid:
-                    msg += f" (Amazon suggests ${suggested_bid:.2f})"
-                flags.append({
-                    "type": "bid_below_range",
-                    "severity": "info",
-                    "target": target,
-                    "campaign": campaign,
-                    "current_bid": current_bid,
-                    "suggested_bid": suggested_bid,
-                    "recommended_bid": max_bid,
-                    "message": msg,
-                })
-
-    # Build recommendation table
-    cols = [
-        "campaign_name",
-        "targeting",
-        "impressions",
-        "clicks",
-        "orders",
-        "spend",
-        "conversion_rate",
-    ]
-    rec_df = df[cols].copy()
-
+            if suggested_bid:
+                msg += f" (Amazon suggests ${suggested_bid:.2f})"
+
+        flags.append({
+            "type": flag_type,
+            "severity": severity,
+            "target": target,
+            "campaign": campaign,
+            "current_bid": current_bid,
+            "suggested_bid": suggested_bid,
+            "recommended_bid": recommended_bid,
+            "message": msg,
+        })
+
+    # Build recommendation table in one construction from the columns kept
+    # and the arrays computed above
+    columns = {
+        col: df[col]
+        for col in ["campaign_name", "targeting", "impressions", "clicks", "orders", "spend"]
+    }
+    columns["conversion_rate"] = conversion_rate
     if has_bid:
-        rec_df["current_bid"] = df["bid"]
+        columns["current_bid"] = df["bid"]
     if has_suggested:
-        rec_df["suggested_bid"] = df["suggested_bid_median"]
-    rec_df["max_profitable_bid"] = df["max_profitable_bid"]
+        columns["suggested_bid"] = df["suggested_bid_median"]
+    columns["max_profitable_bid"] = max_bids
+    rec_df = pd.DataFrame(columns, index=df.index)
 
     # Sort by spend descending (most spend = most important to optimize)
-    rec_df = rec_df.sort_values("spend", ascending=False).reset_index(drop=True)
+    rec_df = rec_df.sort_values("spend", ascending=False, kind="stable", ignore_index=True)
 
     return {"table": rec_df, "flags": flags}
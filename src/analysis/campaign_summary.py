@@ -2,6 +2,7 @@
 
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from src.ingest.targeting import _METRIC_AGG, DATA_SOURCE_SEARCH_TERMS
@@ -25,40 +26,48 @@ def generate_campaign_summary(
     if targeting_df.empty or "campaign_name" not in targeting_df.columns:
         return {"table": pd.DataFrame(), "wow_available": False}
 
-    grouped = targeting_df.groupby("campaign_name").agg(**_METRIC_AGG).reset_index()
+    # Group on dictionary-encoded campaign names (a no-op when already categorical)
+    targeting_df = targeting_df.assign(campaign_name=targeting_df["campaign_name"].astype("category"))
+
+    # campaign_name stays the index until the table is returned, so the
+    # WoW deltas below subtract positionally aligned columns
+    grouped = targeting_df.groupby("campaign_name", observed=True).agg(**_METRIC_AGG)
 
     # Propagate data_source: if any row for a campaign is supplemental, label it
     if "data_source" in targeting_df.columns:
-        source_map = (
-            targeting_df.groupby("campaign_name")["data_source"]
+        grouped["data_source"] = (
+            targeting_df.groupby("campaign_name", observed=True)["data_source"]
             .apply(lambda x: x.iloc[0] if x.nunique() == 1 else "mixed")
-            .to_dict()
         )
-        grouped["data_source"] = grouped["campaign_name"].map(source_map)
     else:
         grouped["data_source"] = DATA_SOURCE_SEARCH_TERMS
 
-    # Compute derived metrics
-    grouped["ctr"] = (grouped["clicks"] / grouped["impressions"]).where(grouped["impressions"] > 0, 0)
-    grouped["avg_cpc"] = (grouped["spend"] / grouped["clicks"]).where(grouped["clicks"] > 0, 0)
-    grouped["acos"] = (grouped["spend"] / grouped["sales"]).where(grouped["sales"] > 0, None)
-    grouped["roas"] = (grouped["sales"] / grouped["spend"]).where(grouped["spend"] > 0, None)
+    # Compute derived metrics (masked divisions; acos/roas are NaN when undefined)
+    impressions, clicks, spend, sales = (
+        grouped[col].to_numpy(dtype="float64")
+        for col in ["impressions", "clicks", "spend", "sales"]
+    )
+    grouped["ctr"] = np.divide(clicks, impressions, out=np.zeros(len(grouped)), where=impressions > 0)
+    grouped["avg_cpc"] = np.divide(spend, clicks, out=np.zeros(len(grouped)), where=clicks > 0)
+    grouped["acos"] = np.divide(spend, sales, out=np.full(len(grouped), np.nan), where=sales > 0)
+    grouped["roas"] = np.divide(sales, spend, out=np.full(len(grouped), np.nan), where=spend > 0)
 
-    result = {"table": grouped, "wow_available": False}
+    wow_available = False
 
     # Week-over-week comparison
     if prior_week_df is not None and not prior_week_df.empty:
-        prior = prior_week_df.set_index("campaign_name")
-        current = grouped.set_index("campaign_name")
+        # Align prior rows to this week's campaigns once, not per metric
+        prior = prior_week_df.set_index("campaign_name").reindex(grouped.index.astype(object))
 
         wow_metrics = ["impressions", "clicks", "spend", "orders", "ctr", "acos"]
         for metric in wow_metrics:
-            if metric in prior.columns and metric in current.columns:
+            if metric in prior.columns and metric in grouped.columns:
                 delta_col = f"{metric}_delta"
-                current[delta_col] = current[metric] - prior[metric]
+                grouped[delta_col] = (
+                    grouped[metric].to_numpy(dtype="float64")
+                    - prior[metric].to_numpy(dtype="float64", na_value=np.nan)
+                )
 
-        grouped = current.reset_index()
-        result["table"] = grouped
-        result["wow_available"] = True
+        wow_available = True
 
-    return result
+    return {"table": grouped.reset_index(), "wow_available": wow_available}
@@ -1,7 +1,12 @@
 """KDP sales reconciliation against ad-attributed orders."""
 
+import functools
+
+import numpy as np
 import pandas as pd
 
+from src.utils.config_index import build_config_index
+
 
 def reconcile_kdp_sales(
     kdp_df: pd.DataFrame,
@@ -12,6 +17,7 @@ def reconcile_kdp_sales(
     config: dict = None,
     cumulative_prior_spend: float = None,
     cumulative_kdp_df: pd.DataFrame = None,
+    config_index: dict = None,
 ) -> dict:
     """Reconcile KDP sales data against Amazon ad-attributed orders.
 
@@ -26,12 +32,14 @@ def reconcile_kdp_sales(
         week_end: Week end date string (YYYY-MM-DD).
         kdp_orders_df: Daily order data from load_kdp_orders() (optional).
         config: Campaign config dict with timeline and book data (optional).
+        config_index: Optional output of build_config_index(); built from
+            config when not supplied.
 
     Returns:
         dict with reconciliation results including attribution gap,
         title/format breakdowns, paired purchases, and ad-influenced analysis.
     """
-    df = kdp_df.copy()
+    df = kdp_df
 
     empty_result = {
         "daily_breakdown": pd.DataFrame(),
@@ -55,58 +63,69 @@ def reconcile_kdp_sales(
     if df.empty:
         return empty_result
 
-    start = pd.to_datetime(week_start)
-    end = pd.to_datetime(week_end)
+    start = _parse_date(week_start)
+    end = _parse_date(week_end)
     granularity = "daily"
 
+    # Column presence checked once; the window filter below keeps all columns
+    cols = frozenset(df.columns)
+    has_date = "date" in cols
+    has_title = "title" in cols
+    has_format = "format" in cols
+    has_royalty = "royalty" in cols
+    units_col = "net_units_sold" if "net_units_sold" in cols else "units_sold"
+    has_units = units_col in cols
+
+    # Monthly exports date every row on the 1st; detected once and shared
+    # with _estimate_ad_influenced, which looks at the same unfiltered export
+    kdp_is_monthly = has_date and _is_monthly(df["date"])
+
     # Filter to relevant time window
-    if "date" in df.columns:
-        dates = df["date"].dropna()
-        if not dates.empty and (dates.dt.day == 1).all():
+    if has_date:
+        if kdp_is_monthly:
             granularity = "monthly"
             target_months = set()
             target_months.add(start.to_period("M"))
             target_months.add(end.to_period("M"))
-            df = df[df["date"].dt.to_period("M").isin(target_months)].copy()
+            df = df[df["date"].dt.to_period("M").isin(target_months)]
         else:
-            df = df[(df["date"] >= start) & (df["date"] <= end)].copy()
-
-    units_col = "net_units_sold" if "net_units_sold" in df.columns else "units_sold"
+            df = df[_date_mask(df["date"], start, end)]
+
+    # Low-cardinality group keys: categorical codes hash far cheaper than strings
+    df = df.astype({col: "category" for col in ("title", "format") if col in cols})
+
+    # Aggregate once at the finest grain (date x title x format); the title,
+    # format and title x format views below are rollups of this frame.
+    # Keys are kept with dropna=False so rollups still see rows whose other
+    # keys are missing, matching a direct groupby on those columns.
+    fine = None
+    if not df.empty and has_units:
+        fine_cols = [c for c in ["date", "title", "format"] if c in cols]
+        fine = df.groupby(fine_cols, dropna=False, observed=True).agg(
+            units=(units_col, "sum"),
+            royalty=("royalty", "sum") if has_royalty else (units_col, "count"),
+        )
 
     # --- Title x Format breakdown ---
     title_format_breakdown = pd.DataFrame()
-    if not df.empty and units_col in df.columns and "format" in df.columns:
+    if fine is not None and has_format:
         title_format_breakdown = (
-            df.groupby(["title", "format"])
-            .agg(
-                units=(units_col, "sum"),
-                royalty=("royalty", "sum") if "royalty" in df.columns else (units_col, "count"),
-            )
+            fine.groupby(level=["title", "format"], observed=True)
+            .sum()
             .reset_index()
             .sort_values(["title", "format"])
         )
 
     # --- Daily breakdown ---
-    group_cols = ["title", "format"]
-    if "date" in df.columns and not df.empty:
-        group_cols = ["date"] + group_cols
-
     daily_breakdown = pd.DataFrame()
-    if not df.empty and units_col in df.columns:
-        daily_breakdown = (
-            df.groupby([c for c in group_cols if c in df.columns])
-            .agg(
-                units=(units_col, "sum"),
-                royalty=("royalty", "sum") if "royalty" in df.columns else (units_col, "count"),
-            )
-            .reset_index()
-        )
-        if "date" in daily_breakdown.columns:
+    if fine is not None:
+        daily_breakdown = fine.reset_index().dropna(subset=fine_cols).reset_index(drop=True)
+        if has_date:
             daily_breakdown = daily_breakdown.sort_values(["date", "title"])
 
     # --- Totals ---
-    total_kdp_units = int(df[units_col].sum()) if units_col in df.columns and not df.empty else 0
-    total_kdp_royalty = float(df["royalty"].sum()) if "royalty" in df.columns and not df.empty else 0.0
+    total_kdp_units = int(_column_sum(df[units_col])) if has_units and not df.empty else 0
+    total_kdp_royalty = float(_column_sum(df["royalty"])) if has_royalty and not df.empty else 0.0
 
     # Ad-attributed orders and sales from campaign summary
     summary_table = campaign_summary.get("table", pd.DataFrame())
@@ -115,11 +134,11 @@ def reconcile_kdp_sales(
     total_ad_spend = 0.0
     if not summary_table.empty:
         if "orders" in summary_table.columns:
-            total_ad_orders = int(summary_table["orders"].sum())
+            total_ad_orders = int(_column_sum(summary_table["orders"]))
         if "sales" in summary_table.columns:
-            total_ad_sales = float(summary_table["sales"].sum())
+            total_ad_sales = float(_column_sum(summary_table["sales"]))
         if "spend" in summary_table.columns:
-            total_ad_spend = float(summary_table["spend"].sum())
+            total_ad_spend = float(_column_sum(summary_table["spend"]))
 
     # Attribution gap
     gap = total_kdp_units - total_ad_orders
@@ -127,31 +146,18 @@ def reconcile_kdp_sales(
 
     # --- Per-title breakdown ---
     title_totals = pd.DataFrame()
-    if not df.empty and units_col in df.columns:
-        title_totals = (
-            df.groupby("title")
-            .agg(
-                units=(units_col, "sum"),
-                royalty=("royalty", "sum") if "royalty" in df.columns else (units_col, "count"),
-            )
-            .reset_index()
-        )
+    if fine is not None and has_title:
+        title_totals = fine.groupby(level="title", observed=True).sum().reset_index()
 
     # --- Per-format breakdown ---
     format_totals = pd.DataFrame()
-    if not df.empty and "format" in df.columns:
-        format_totals = (
-            df.groupby("format")
-            .agg(
-                units=(units_col, "sum"),
-                royalty=("royalty", "sum") if "royalty" in df.columns else (units_col, "count"),
-            )
-            .reset_index()
-        )
+    if fine is not None and has_format:
+        format_totals = fine.groupby(level="format", observed=True).sum().reset_index()
 
     # --- Paired purchase detection ---
     paired_purchases = _detect_paired_purchases(
         kdp_orders_df, config, week_start=week_start, week_end=week_end,
+        config_index=config_index,
     )
 
     # --- Ad-influenced analysis ---
@@ -164,13 +170,14 @@ def reconcile_kdp_sales(
         total_ad_sales=total_ad_sales,
         cumulative_prior_spend=cumulative_prior_spend,
         cumulative_kdp_df=cumulative_kdp_df,
+        kdp_is_monthly=kdp_is_monthly,
     )
 
     # --- Build the comparison note ---
     if granularity == "monthly":
         month_names = sorted(set(
             d.strftime("%B %Y") for d in df["date"].dropna()
-        )) if "date" in df.columns and not df.empty else []
+        )) if has_date and not df.empty else []
         period_str = ", ".join(month_names) if month_names else "the matching month"
         note = (
             f"KDP data is monthly granularity ({period_str}). "
@@ -213,11 +220,51 @@ def reconcile_kdp_sales(
     }
 
 
+@functools.lru_cache(maxsize=256)
+def _parse_date(value) -> pd.Timestamp:
+    """Parse a date string (or Timestamp) once; repeat weeks hit the cache."""
+    return pd.Timestamp(value)
+
+
+def _date_mask(dates: pd.Series, start: pd.Timestamp, end: pd.Timestamp = None) -> np.ndarray:
+    """Boolean mask of dates within [start, end] (end optional).
+
+    datetime64 columns are compared as raw numpy arrays, skipping pandas'
+    Timestamp comparison dispatch; NaT never matches, as with pandas.
+    """
+    if dates.dtype.kind != "M":
+        mask = dates >= start
+        if end is not None:
+            mask &= dates <= end
+        return mask.to_numpy(dtype=bool)
+
+    values = dates.to_numpy()
+    mask = values >= start.to_datetime64()
+    if end is not None:
+        mask &= values <= end.to_datetime64()
+    return mask
+
+
+def _column_sum(series: pd.Series):
+    """Sum a numeric column as a raw NumPy reduction, skipping NaN."""
+    values = series.to_numpy()
+    if values.dtype.kind in "iub":
+        return values.sum()
+    return np.nansum(series.to_numpy(dtype="float64", na_value=np.nan))
+
+
+def _is_monthly(dates: pd.Series) -> bool:
+    """True when every non-null date falls on the 1st (monthly granularity)."""
+    dates = dates.dropna()
+    return not dates.empty and bool((dates.dt.day == 1).all())
+
+
 def _detect_paired_purchases(
     kdp_orders_df: pd.DataFrame,
     config: dict,
     week_start: str = None,
     week_end: str = None,
+    config_index: dict = None,
 ) -> list:
     """Detect same-day purchases of both Book 1 and Book 2.
 
@@ -230,69 +277,62 @@ def _detect_paired_purchases(
         config: Campaign config dict with book ASINs.
         week_start: Start of report window (YYYY-MM-DD). Filters results.
         week_end: End of report window (YYYY-MM-DD). Filters results.
+        config_index: Optional output of build_config_index(); built from
+            config when not supplied.
 
     Returns a list of dicts with date and details for each paired purchase.
     """
     if kdp_orders_df is None or kdp_orders_df.empty or config is None:
         return []
 
-    # Get book ASINs from config
-    books = config.get("books", {})
-    book1_asins = set()
-    book2_asins = set()
-    for key, book in books.items():
-        asins = {book.get("asin_kindle", ""), book.get("asin_paperback", "")} - {""}
-        if "book_1" in key or "Book 1" in book.get("short_title", ""):
-            book1_asins.update(asins)
-        elif "book_2" in key or "Book 2" in book.get("short_title", ""):
-            book2_asins.update(asins)
-
-    if not book1_asins or not book2_asins:
+    # Book role per ASIN (Book 1 / Book 2), precomputed from the config
+    if config_index is None:
+        config_index = build_config_index(config)
+    asin_to_role = config_index["book_roles"]
+    if not {"Book 1", "Book 2"} <= set(asin_to_role.values()):
         return []
 
-    df = kdp_orders_df.copy()
+    df = kdp_orders_df
     if "date" not in df.columns or "asin" not in df.columns:
         return []
 
-    df = df.dropna(subset=["date"])
-    if df.empty:
-        return []
-
-    # Filter to the report's date window
+    # Drop undated rows and filter to the report's date window in one mask
+    # (NaT never falls inside the window)
     if week_start and week_end:
-        ws = pd.to_datetime(week_start)
-        we = pd.to_datetime(week_end)
-        df = df[(df["date"] >= ws) & (df["date"] <= we)].copy()
-        if df.empty:
-            return []
+        keep = _date_mask(df["date"], _parse_date(week_start), _parse_date(week_end))
+    else:
+        keep = df["date"].notna().to_numpy()
+    if not keep.any():
+        return []
+    df = df[keep]
 
     # Skip monthly-granularity rows: if ALL dates are 1st-of-month,
     # this is likely a monthly report. Individual rows on the 1st are
     # fine when other daily dates are present.
-    dates = df["date"].dropna()
-    if not dates.empty and (dates.dt.day == 1).all():
+    if _is_monthly(df["date"]):
         return []
 
+    # Tag every row with its book role in one hash lookup, then find dates
+    # that have both books
+    role = df["asin"].astype(str).map(asin_to_role)
+    per_date = (
+        pd.DataFrame({"book1": role.eq("Book 1"), "book2": role.eq("Book 2")})
+        .groupby(df["date"])
+        .any()
+    )
+    paired_dates = per_date.index[per_date["book1"] & per_date["book2"]]
+
+    # Only the book rows on paired dates are needed for the details
+    book_rows = df.assign(role=role)[role.notna() & df["date"].isin(paired_dates)]
+
     paired = []
-    for date, group in df.groupby("date"):
-        asins_on_date = set(group["asin"].astype(str))
-        has_book1 = bool(asins_on_date & book1_asins)
-        has_book2 = bool(asins_on_date & book2_asins)
-
-        if has_book1 and has_book2:
-            titles = group[["asin", "title"]].drop_duplicates()
-            detail_parts = []
-            for _, row in titles.iterrows():
-                asin = str(row["asin"])
-                title = row.get("title", asin)
-                if asin in book1_asins:
-                    detail_parts.append(f"Book 1: {title}")
-                elif asin in book2_asins:
-                    detail_parts.append(f"Book 2: {title}")
-            paired.append({
-                "date": date.strftime("%Y-%m-%d") if hasattr(date, "strftime") else str(date),
-                "details": " + ".join(sorted(detail_parts)),
-            })
+    for date, group in book_rows.groupby("date"):
+        titles = group.drop_duplicates(subset=["asin", "title"])
+        detail_parts = [f"{r}: {t}" for r, t in zip(titles["role"], titles["title"])]
+        paired.append({
+            "date": date.strftime("%Y-%m-%d") if hasattr(date, "strftime") else str(date),
+            "details": " + ".join(sorted(detail_parts)),
+        })
 
     return sorted(paired, key=lambda x: x["date"])
 
@@ -306,6 +346,7 @@ def _estimate_ad_influenced(
     total_ad_sales: float,
     cumulative_prior_spend: float = None,
     cumulative_kdp_df: pd.DataFrame = None,
+    kdp_is_monthly: bool = None,
 ) -> dict:
     """Estimate total ad-influenced sales across all books and formats.
 
@@ -316,6 +357,8 @@ def _estimate_ad_influenced(
     - Paired purchases (both books bought together)
 
     Uses the ads start date from config to separate pre-ad from post-ad sales.
+    kdp_is_monthly, when given, is the caller's granularity check on kdp_df
+    and saves re-scanning its dates.
     """
     if config is None:
         return None
@@ -325,7 +368,7 @@ def _estimate_ad_influenced(
     if not ads_start_str:
         return None
 
-    ads_start = pd.to_datetime(ads_start_str)
+    ads_start = _parse_date(ads_start_str)
 
     # --- Collect all post-ad KDP royalty data ---
     # Merge cumulative DB data (all saved snapshots) with the current KDP
@@ -355,33 +398,38 @@ def _estimate_ad_influenced(
         combined_kdp = kdp_df if not kdp_df.empty else pd.DataFrame()
 
     if not combined_kdp.empty and "date" in combined_kdp.columns:
-        df = combined_kdp.copy()
+        df = combined_kdp
         units_col = "net_units_sold" if "net_units_sold" in df.columns else "units_sold"
 
         # For monthly data, consider a month "post-ad" if it contains or follows the ad start
-        dates = df["date"].dropna()
-        is_monthly = not dates.empty and (dates.dt.day == 1).all()
+        if combined_kdp is kdp_df and kdp_is_monthly is not None:
+            is_monthly = kdp_is_monthly
+        else:
+            is_monthly = _is_monthly(df["date"])
 
         if is_monthly:
             ads_start_period = ads_start.to_period("M")
-            post_mask = df["date"].dt.to_period("M") >= ads_start_period
+            post = (df["date"].dt.to_period("M") >= ads_start_period).to_numpy(dtype=bool)
         else:
-            post_mask = df["date"] >= ads_start
-
-        post_df = df[post_mask]
-        pre_df = df[~post_mask]
-
-        if units_col in post_df.columns:
-            post_ad_units = int(post_df[units_col].sum())
-            pre_ad_units = int(pre_df[units_col].sum()) if not pre_df.empty else 0
-        if "royalty" in post_df.columns:
-            post_ad_royalty = float(post_df["royalty"].sum())
-            pre_ad_royalty = float(pre_df["royalty"].sum()) if not pre_df.empty else 0
+            post = _date_mask(df["date"], ads_start)
+
+        # Period totals are masked column sums; only the post-ad breakdown
+        # needs a DataFrame slice and a groupby.
+        has_pre = not post.all()
+        if units_col in df.columns:
+            units = df[units_col].to_numpy(dtype="float64", na_value=np.nan)
+            post_ad_units = int(np.nansum(units[post]))
+            pre_ad_units = int(np.nansum(units[~post])) if has_pre else 0
+        if "royalty" in df.columns:
+            royalty = df["royalty"].to_numpy(dtype="float64", na_value=np.nan)
+            post_ad_royalty = float(np.nansum(royalty[post]))
+            pre_ad_royalty = float(np.nansum(royalty[~post])) if has_pre else 0
 
         # Breakdown by title x format for post-ad period
-        if not post_df.empty and units_col in post_df.columns and "format" in post_df.columns:
+        if post.any() and units_col in df.columns and "format" in df.columns:
+            post_df = df.loc[post, [c for c in ("title", "format", units_col, "royalty") if c in df.columns]]
             breakdown = (
-                post_df.groupby(["title", "format"])
+                post_df.groupby(["title", "format"], observed=True)
                 .agg(
                     units=(units_col, "sum"),
                     royalty=("royalty", "sum") if "royalty" in post_df.columns else (units_col, "count"),
@@ -394,11 +442,11 @@ def _estimate_ad_influenced(
     # --- Also count post-ad ebook orders from daily data ---
     post_ad_ebook_units = 0
     if kdp_orders_df is not None and not kdp_orders_df.empty:
-        orders = kdp_orders_df.copy()
+        orders = kdp_orders_df
         if "date" in orders.columns:
-            orders_post = orders[orders["date"] >= ads_start]
+            orders_post = orders[_date_mask(orders["date"], ads_start)]
             if "paid_units" in orders_post.columns:
-                post_ad_ebook_units = int(orders_post["paid_units"].sum())
+                post_ad_ebook_units = int(_column_sum(orders_post["paid_units"]))
 
     # --- Calculate influenced ROAS ---
     # Use cumulative spend (prior snapshots + current week) to match the
@@ -421,8 +469,9 @@ def _estimate_ad_influenced(
     # Determine the note about data granularity
     note_parts = []
     if kdp_df is not None and not kdp_df.empty and "date" in kdp_df.columns:
-        dates = kdp_df["date"].dropna()
-        if not dates.empty and (dates.dt.day == 1).all():
+        if kdp_is_monthly is None:
+            kdp_is_monthly = _is_monthly(kdp_df["date"])
+        if kdp_is_monthly:
             note_parts.append(
                 "KDP royalty data is monthly. Post-ad totals include the full month "
                 "of the ad start date — some pre-ad sales may be included."
@@ -1,11 +1,29 @@
 """Keyword targeting performance analysis with flags."""
 
+import numpy as np
 import pandas as pd
 
+from src.utils.config_index import build_config_index
+
+# Columns carried into the keyword table (rendered columns plus bid for flags)
+TABLE_COLUMNS = [
+    "campaign_name",
+    "targeting",
+    "match_type",
+    "impressions",
+    "clicks",
+    "ctr",
+    "cpc",
+    "spend",
+    "orders",
+    "bid",
+]
+
 
 def analyze_keywords(
     targeting_df: pd.DataFrame,
     config: dict,
+    config_index: dict = None,
 ) -> dict:
     """Analyze keyword-targeting campaign performance.
 
@@ -14,6 +32,8 @@ def analyze_keywords(
     Args:
         targeting_df: Normalized targeting report DataFrame.
         config: Parsed campaigns.yaml config dict.
+        config_index: Optional output of build_config_index(); built from
+            config when not supplied.
 
     Returns:
         dict with keys:
@@ -27,48 +47,63 @@ def analyze_keywords(
     high_spend_threshold = settings.get("high_spend_flag", 5.0)
 
     # Filter to keyword targeting campaigns
-    kw_campaigns = []
-    for key, campaign in config.get("campaigns", {}).items():
-        if campaign.get("type") == "keyword_targeting":
-            kw_campaigns.append(campaign["name"])
+    if config_index is None:
+        config_index = build_config_index(config)
+    kw_campaigns = config_index["keyword_campaigns"]
 
-    df = targeting_df[targeting_df["campaign_name"].isin(kw_campaigns)].copy()
+    # Keep only the rows and columns the table and flags use (no defensive
+    # copy: the derived column is added via assign). On a categorical
+    # campaign_name, isin is already a membership test on the integer codes.
+    keep = targeting_df["campaign_name"].isin(kw_campaigns)
+    columns = [col for col in TABLE_COLUMNS if col in targeting_df.columns]
+    df = targeting_df.loc[keep, columns]
 
     if df.empty:
         return {"table": pd.DataFrame(), "flags": []}
 
     # Compute derived metrics
-    df["conversion_rate"] = df.apply(
-        lambda r: r["orders"] / r["clicks"] if r["clicks"] > 0 else 0,
-        axis=1,
-    )
+    clicks = df["clicks"].to_numpy(dtype="float64")
+    df = df.assign(conversion_rate=np.divide(
+        df["orders"].to_numpy(dtype="float64"), clicks,
+        out=np.zeros(len(df)), where=clicks > 0,
+    ))
 
     # Sort by impressions descending
-    df = df.sort_values("impressions", ascending=False).reset_index(drop=True)
+    df = df.sort_values("impressions", ascending=False, ignore_index=True)
+
+    # Generate flags from column masks; only flagged rows are visited, and a
+    # row with both conditions keeps zero_impressions first
+    zero_impressions = (df["impressions"] == 0).to_numpy()
+    high_spend = ((df["spend"] > high_spend_threshold) & (df["orders"] == 0)).to_numpy()
+    flagged = np.flatnonzero(zero_impressions | high_spend)
+
+    keywords = df["targeting"].to_numpy()[flagged].tolist()
+    spends = df["spend"].to_numpy()[flagged].tolist()
+    bids = (
+        df["bid"].to_numpy(dtype="float64", na_value=np.nan)[flagged].tolist()
+        if "bid" in df.columns else [np.nan] * len(flagged)
+    )
 
-    # Generate flags
     flags = []
-    for _, row in df.iterrows():
-        keyword = row["targeting"]
-
-        if row["impressions"] == 0:
+    for i, keyword, spend, bid in zip(flagged.tolist(), keywords, spends, bids):
+        if zero_impressions[i]:
             flags.append({
                 "type": "zero_impressions",
                 "severity": "info",
                 "target": keyword,
                 "message": (
-                    f"Zero impressions — bid (${row['bid']:.2f}) may be too low"
-                    if pd.notna(row.get("bid")) and row.get("bid")
+                    f"Zero impressions — bid (${bid:.2f}) may be too low"
+                    if pd.notna(bid) and bid
                     else "Zero impressions — bid may be too low"
                 ),
             })
 
-        if row["spend"] > high_spend_threshold and row["orders"] == 0:
+        if high_spend[i]:
             flags.append({
                 "type": "high_spend_no_orders",
                 "severity": "warning",
                 "target": keyword,
-                "message": f"${row['spend']:.2f} spent with 0 orders",
+                "message": f"${spend:.2f} spent with 0 orders",
             })
 
     return {"table": df, "flags": flags}
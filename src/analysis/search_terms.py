@@ -1,5 +1,6 @@
 """Search term analysis with drift detection."""
 
+import numpy as np
 import pandas as pd
 
 
@@ -22,10 +23,10 @@ def apply_asin_resolution(result: dict, asin_map: dict) -> dict:
     # Resolve summary search terms
     summary = result.get("summary", pd.DataFrame())
     if not summary.empty and "search_term" in summary.columns:
-        result["summary"] = summary.copy()
-        result["summary"]["search_term"] = result["summary"]["search_term"].map(
-            lambda t: asin_map.get(t, t)
-        )
+        # Dict map in one pass; terms without a resolution keep their value
+        terms = summary["search_term"]
+        resolved = terms.map(asin_map)
+        result["summary"] = summary.assign(search_term=resolved.where(resolved.notna(), terms))
 
     # Resolve ASINs in drift flag messages
     drift_flags = result.get("drift_flags", [])
@@ -45,6 +46,73 @@ def apply_asin_resolution(result: dict, asin_map: dict) -> dict:
     return result
 
 
+def _detect_drift(df: pd.DataFrame) -> list:
+    """Build drift flags for exact and broad match rows, in row order."""
+    if "match_type" not in df.columns:
+        return []
+
+    # Match type has a handful of distinct values: normalize those once and
+    # broadcast back, then only visit the exact/broad rows
+    codes, uniques = pd.factorize(df["match_type"], use_na_sentinel=False)
+    normalized = np.array([str(u).strip().lower() for u in uniques] or [""], dtype=object)
+    match_types = normalized[codes]
+    # Broad rows only matter with meaningful spend; filtering on that column
+    # first keeps low-spend rows out of the per-row string comparison
+    meaningful_spend = (df["spend"] > 0.50).to_numpy(dtype=bool)
+    rows = np.flatnonzero((match_types == "exact") | ((match_types == "broad") & meaningful_spend))
+
+    def values(col):
+        return df[col].to_numpy(dtype=object)[rows].tolist()
+
+    campaigns = values("campaign_name") if "campaign_name" in df.columns else [""] * len(rows)
+
+    drift_flags = []
+    for match_type, targeting, search_term, campaign, impressions, spend in zip(
+        match_types[rows].tolist(),
+        [str(v).strip() for v in values("targeting")],
+        [str(v).strip() for v in values("search_term")],
+        campaigns,
+        values("impressions"),
+        values("spend"),
+    ):
+        # For ASIN campaigns with exact match, search term should equal targeting
+        if match_type == "exact" and targeting != search_term:
+            drift_flags.append({
+                "type": "exact_match_drift",
+                "severity": "warning",
+                "campaign": campaign,
+                "targeting": targeting,
+                "search_term": search_term,
+                "impressions": impressions,
+                "spend": spend,
+                "message": (
+                    f"Exact match drift: targeted '{targeting}' but appeared on "
+                    f"'{search_term}' ({impressions} impressions, "
+                    f"${spend:.2f} spend)"
+                ),
+            })
+
+        # For broad match keywords (already limited to meaningful spend), flag
+        # if search term is very different
+        # (This is informational — broad match is expected to expand)
+        if match_type == "broad" and targeting.lower() not in search_term.lower():
+            drift_flags.append({
+                "type": "broad_match_expansion",
+                "severity": "info",
+                "campaign": campaign,
+                "targeting": targeting,
+                "search_term": search_term,
+                "impressions": impressions,
+                "spend": spend,
+                "message": (
+                    f"Broad match expanded: '{targeting}' → '{search_term}' "
+                    f"(${spend:.2f} spend)"
+                ),
+            })
+
+    return drift_flags
+
+
 def analyze_search_terms(
     search_term_df: pd.DataFrame,
     config: dict,
@@ -67,7 +135,8 @@ def analyze_search_terms(
     settings = config.get("settings", {})
     transition_date = settings.get("exact_match_transition_date")
 
-    df = search_term_df.copy()
+    # Read-only below: grouping and the summary build their own frames
+    df = search_term_df
 
     if df.empty:
         return {"grouped": {}, "drift_flags": [], "summary": pd.DataFrame()}
@@ -75,58 +144,18 @@ def analyze_search_terms(
     # Drift detection: compare targeting vs search_term
     # For exact match, they should be identical
     # For broad/phrase match, search_term can legitimately differ from targeting
-    drift_flags = []
-
-    for _, row in df.iterrows():
-        targeting = str(row.get("targeting", "")).strip()
-        search_term = str(row.get("search_term", "")).strip()
-        match_type = str(row.get("match_type", "")).strip().lower()
-        campaign = row.get("campaign_name", "")
-
-        # For ASIN campaigns with exact match, search term should equal targeting
-        if match_type == "exact" and targeting != search_term:
-            drift_flags.append({
-                "type": "exact_match_drift",
-                "severity": "warning",
-                "campaign": campaign,
-                "targeting": targeting,
-                "search_term": search_term,
-                "impressions": row.get("impressions", 0),
-                "spend": row.get("spend", 0),
-                "message": (
-                    f"Exact match drift: targeted '{targeting}' but appeared on "
-                    f"'{search_term}' ({row.get('impressions', 0)} impressions, "
-                    f"${row.get('spend', 0):.2f} spend)"
-                ),
-            })
-
-        # For broad match keywords, flag if search term is very different
-        # (This is informational — broad match is expected to expand)
-        if match_type == "broad" and targeting.lower() not in search_term.lower():
-            # Only flag if there's meaningful spend
-            if row.get("spend", 0) > 0.50:
-                drift_flags.append({
-                    "type": "broad_match_expansion",
-                    "severity": "info",
-                    "campaign": campaign,
-                    "targeting": targeting,
-                    "search_term": search_term,
-                    "impressions": row.get("impressions", 0),
-                    "spend": row.get("spend", 0),
-                    "message": (
-                        f"Broad match expanded: '{targeting}' → '{search_term}' "
-                        f"(${row.get('spend', 0):.2f} spend)"
-                    ),
-                })
+    drift_flags = _detect_drift(df)
 
     # Group search terms by targeting expression
-    grouped = {}
-    for targeting_expr, group_df in df.groupby("targeting"):
-        grouped[targeting_expr] = group_df.sort_values(
-            "impressions", ascending=False
-        ).reset_index(drop=True)
+    # One stable sort up front; groupby keeps that row order within each group
+    by_impressions = df.sort_values("impressions", ascending=False, kind="stable")
+    grouped = {
+        targeting_expr: group_df.reset_index(drop=True)
+        for targeting_expr, group_df in by_impressions.groupby("targeting")
+    }
 
-    # Summary: top search terms by spend
+    # Summary: top search terms by spend. Group keys come out sorted and the
+    # stable spend sort keeps them alphabetical within equal spend.
     summary = (
         df.groupby("search_term")
         .agg(
@@ -135,7 +164,7 @@ def analyze_search_terms(
             spend=("spend", "sum"),
             orders=("orders", "sum"),
         )
-        .sort_values("spend", ascending=False)
+        .sort_values("spend", ascending=False, kind="stable")
         .reset_index()
     )
 
@@ -0,0 +1,28 @@
+"""Helpers shared by the report loaders in this package."""
+
+import importlib.util
+
+import pandas as pd
+
+
+def _xlsx_engine() -> str:
+    """Prefer the Rust calamine reader when installed (pandas >= 2.2)."""
+    pandas_version = tuple(int(part) for part in pd.__version__.split(".")[:2])
+    if pandas_version >= (2, 2) and importlib.util.find_spec("python_calamine"):
+        return "calamine"
+    return "openpyxl"
+
+
+# Engine for every XLSX read in the ingest modules
+XLSX_ENGINE = _xlsx_engine()
+
+
+def parse_distinct(series: pd.Series, parse) -> pd.Series:
+    """Apply a string-cleaning parse once per distinct value.
+
+    Report columns repeat the same few thousand values across many rows, so
+    parsing the uniques and broadcasting back skips most of the string work.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    parsed = parse(pd.Series(uniques))
+    return parsed.take(codes).set_axis(series.index).rename(series.name)
@@ -19,10 +19,30 @@ When daily data is available, Combined Sales is the primary source (all formats,
 When only monthly data is available, falls back to individual royalty sheets.
 """
 
+import codecs
+import itertools
+
+import numpy as np
 import pandas as pd
 
+from src.ingest.common import XLSX_ENGINE, parse_distinct
+
+# KDP exports label the US store exactly this way; matched by equality, not substring
+MARKETPLACE = "Amazon.com"
+
+# Low-cardinality label columns stored as categoricals after ingest
+CATEGORY_COLUMNS = ("marketplace", "format", "currency", "royalty_type", "transaction_type")
+
+
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({col: "category" for col in CATEGORY_COLUMNS if col in df.columns})
+
 
 def _clean_currency(series: pd.Series) -> pd.Series:
+    return parse_distinct(series, _parse_currency)
+
+
+def _parse_currency(series: pd.Series) -> pd.Series:
     cleaned = (
         series.astype(str)
         .str.replace("$", "", regex=False)
@@ -33,6 +53,33 @@ def _clean_currency(series: pd.Series) -> pd.Series:
     return pd.to_numeric(cleaned, errors="coerce").fillna(0.0)
 
 
+def _amazon_com_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep Amazon.com rows when the export has a marketplace column.
+
+    The filtered rows are copied so later column writes never touch (or warn
+    about) the unfiltered source, with or without Copy-on-Write.
+    """
+    if "marketplace" not in df.columns:
+        return df
+    return df[df["marketplace"].eq(MARKETPLACE)].copy()
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Parse KDP date columns (YYYY-MM monthly or YYYY-MM-DD daily).
+
+    Text dates go through the single-pass ISO 8601 parser; only values it
+    rejects fall back to per-element format detection.
+    """
+    if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+        return pd.to_datetime(values, format="mixed", errors="coerce")
+
+    parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    leftover = parsed.isna() & values.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(values[leftover], format="mixed", errors="coerce")
+    return parsed
+
+
 def _infer_format(transaction_type: str) -> str:
     """Infer book format from KDP Transaction Type field."""
     t = str(transaction_type).lower()
@@ -43,7 +90,22 @@ def _infer_format(transaction_type: str) -> str:
     return "ebook"
 
 
-def load_kdp_report(filepath: str) -> pd.DataFrame:
+def _format_from_asin(asins: pd.Series) -> np.ndarray:
+    """Kindle ASINs (B0...) are ebooks; anything else is a paperback ISBN."""
+    return np.where(asins.astype(str).str.startswith("B0", na=False), "ebook", "paperback")
+
+
+def open_kdp_workbook(filepath: str):
+    """Open an XLSX export once so the royalty and order loaders share it.
+
+    Returns a pd.ExcelFile (usable as a context manager), or None for CSVs.
+    """
+    if not filepath.endswith((".xlsx", ".xls")):
+        return None
+    return pd.ExcelFile(filepath, engine=XLSX_ENGINE)
+
+
+def load_kdp_report(filepath: str, xls: pd.ExcelFile = None) -> pd.DataFrame:
     """Load and normalize a KDP Sales Dashboard export.
 
     Handles both:
@@ -53,23 +115,26 @@ def load_kdp_report(filepath: str) -> pd.DataFrame:
     Auto-detects Dashboard (daily) vs Orders/Lifetime (monthly) export.
     Prefers Combined Sales sheet when daily data is available.
 
+    Pass xls (from open_kdp_workbook) to reuse an already parsed workbook.
+
     Returns a DataFrame with columns:
         date, title, author, asin, format, units_sold, net_units_sold, royalty, marketplace
     """
     if filepath.endswith((".xlsx", ".xls")):
-        return _load_xlsx_workbook(filepath)
+        return _categorize(_load_xlsx_workbook(filepath, xls=xls))
     else:
-        return _load_csv(filepath)
+        return _categorize(_load_csv(filepath))
 
 
-def _load_xlsx_workbook(filepath: str) -> pd.DataFrame:
+def _load_xlsx_workbook(filepath: str, xls: pd.ExcelFile = None) -> pd.DataFrame:
     """Parse the multi-sheet KDP XLSX workbook.
 
     Strategy:
     1. Try Combined Sales first — if it has daily dates, use it (Dashboard report)
     2. Fall back to individual royalty sheets (Lifetime/Orders report with monthly dates)
     """
-    xls = pd.ExcelFile(filepath, engine="openpyxl")
+    if xls is None:
+        xls = pd.ExcelFile(filepath, engine=XLSX_ENGINE)
 
     # Try Combined Sales first
     if "Combined Sales" in xls.sheet_names:
@@ -80,40 +145,29 @@ def _load_xlsx_workbook(filepath: str) -> pd.DataFrame:
             is_daily = not dates.empty and not (dates.dt.day == 1).all()
             if is_daily:
                 # Dashboard report — Combined Sales has daily data for all formats
-                if "marketplace" in combined_df.columns:
-                    combined_df = combined_df[
-                        combined_df["marketplace"].eq("Amazon.com")
-                    ].copy()
-                return combined_df
+                return _amazon_com_rows(combined_df)
+
+    # Fall back to individual royalty sheets (Lifetime/Orders report),
+    # read together in one call
+    royalty_sheets = {
+        "eBook Royalty": "ebook",
+        "Paperback Royalty": "paperback",
+        "Hardcover Royalty": "hardcover",
+    }
+    present = [name for name in royalty_sheets if name in xls.sheet_names]
+    sheets = pd.read_excel(xls, sheet_name=present) if present else {}
 
-    # Fall back to individual royalty sheets (Lifetime/Orders report)
     frames = []
-
-    if "eBook Royalty" in xls.sheet_names:
-        ebook_df = pd.read_excel(xls, sheet_name="eBook Royalty")
-        ebook_df = _normalize_royalty_sheet(ebook_df, book_format="ebook")
-        frames.append(ebook_df)
-
-    if "Paperback Royalty" in xls.sheet_names:
-        pb_df = pd.read_excel(xls, sheet_name="Paperback Royalty")
-        pb_df = _normalize_royalty_sheet(pb_df, book_format="paperback")
-        frames.append(pb_df)
-
-    if "Hardcover Royalty" in xls.sheet_names:
-        hc_df = pd.read_excel(xls, sheet_name="Hardcover Royalty")
-        if not hc_df.empty:
-            hc_df = _normalize_royalty_sheet(hc_df, book_format="hardcover")
-            frames.append(hc_df)
+    for name, sheet_df in sheets.items():
+        # An empty hardcover sheet is common (no hardcover edition)
+        if name == "Hardcover Royalty" and sheet_df.empty:
+            continue
+        frames.append(_normalize_royalty_sheet(sheet_df, book_format=royalty_sheets[name]))
 
     if not frames:
         return pd.DataFrame()
 
-    df = pd.concat(frames, ignore_index=True)
-
-    if "marketplace" in df.columns:
-        df = df[df["marketplace"].eq("Amazon.com")].copy()
-
-    return df
+    return _amazon_com_rows(pd.concat(frames, ignore_index=True))
 
 
 def _parse_combined_sales(xls: pd.ExcelFile) -> pd.DataFrame:
@@ -165,7 +219,7 @@ def _parse_combined_sales(xls: pd.ExcelFile) -> pd.DataFrame:
         df["format"] = "ebook"
 
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], format="mixed", errors="coerce")
+        df["date"] = _parse_dates(df["date"])
 
     for col in ["units_sold", "units_refunded", "net_units_sold"]:
         if col in df.columns:
@@ -212,7 +266,7 @@ def _normalize_royalty_sheet(df: pd.DataFrame, book_format: str) -> pd.DataFrame
     df["format"] = book_format
 
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], format="mixed", errors="coerce")
+        df["date"] = _parse_dates(df["date"])
 
     for col in ["units_sold", "units_refunded", "net_units_sold"]:
         if col in df.columns:
@@ -228,21 +282,27 @@ def _normalize_royalty_sheet(df: pd.DataFrame, book_format: str) -> pd.DataFrame
     return df
 
 
-def load_kdp_orders(filepath: str) -> pd.DataFrame:
+def load_kdp_orders(filepath: str, xls: pd.ExcelFile = None) -> pd.DataFrame:
     """Load daily order data from the KDP workbook.
 
     Uses "eBook Orders Placed" for daily eBook data and
     "Orders Processed" for all-format order data.
     Format is inferred from ASIN when not explicitly tagged.
+    Pass xls (from open_kdp_workbook) to reuse an already parsed workbook.
     """
     if not filepath.endswith((".xlsx", ".xls")):
         return pd.DataFrame()
 
-    xls = pd.ExcelFile(filepath, engine="openpyxl")
+    if xls is None:
+        xls = pd.ExcelFile(filepath, engine=XLSX_ENGINE)
     frames = []
 
-    if "eBook Orders Placed" in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name="eBook Orders Placed")
+    # Both order sheets are read in one call
+    present = [name for name in ("eBook Orders Placed", "Orders Processed") if name in xls.sheet_names]
+    sheets = pd.read_excel(xls, sheet_name=present) if present else {}
+
+    if "eBook Orders Placed" in sheets:
+        df = sheets["eBook Orders Placed"]
         df.columns = df.columns.str.strip()
         df = df.rename(columns={
             "Date": "date",
@@ -255,12 +315,10 @@ def load_kdp_orders(filepath: str) -> pd.DataFrame:
         })
         df["format"] = "ebook"
         df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        if "marketplace" in df.columns:
-            df = df[df["marketplace"].eq("Amazon.com")].copy()
-        frames.append(df)
+        frames.append(_amazon_com_rows(df))
 
-    if "Orders Processed" in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name="Orders Processed")
+    if "Orders Processed" in sheets:
+        df = sheets["Orders Processed"]
         df.columns = df.columns.str.strip()
         df = df.rename(columns={
             "Date": "date",
@@ -271,22 +329,18 @@ def load_kdp_orders(filepath: str) -> pd.DataFrame:
             "Paid Units": "paid_units",
             "Free Units": "free_units",
         })
-        df["date"] = pd.to_datetime(df["date"], format="mixed", errors="coerce")
+        df["date"] = _parse_dates(df["date"])
         # Infer format from ASIN: B0... = ebook/kindle, 979.../978... = paperback ISBN
         if "asin" in df.columns:
-            df["format"] = df["asin"].apply(
-                lambda x: "ebook" if str(x).startswith("B0") else "paperback"
-            )
+            df["format"] = _format_from_asin(df["asin"])
         else:
             df["format"] = "paperback"
-        if "marketplace" in df.columns:
-            df = df[df["marketplace"].eq("Amazon.com")].copy()
-        frames.append(df)
+        frames.append(_amazon_com_rows(df))
 
     if not frames:
         return pd.DataFrame()
 
-    return pd.concat(frames, ignore_index=True)
+    return _categorize(pd.concat(frames, ignore_index=True))
 
 
 def _load_csv(filepath: str) -> pd.DataFrame:
@@ -308,12 +362,11 @@ def _load_csv(filepath: str) -> pd.DataFrame:
         "Royalty": "royalty",
     }
 
+    # Header probe on raw bytes; only the first 10 lines are read
     header_row = 0
-    with open(filepath, "r", encoding="utf-8-sig") as f:
-        for i, line in enumerate(f):
-            if i >= 10:
-                break
-            if line.strip().startswith("Date") and "Title" in line:
+    with open(filepath, "rb") as f:
+        for i, line in enumerate(itertools.islice(f, 10)):
+            if line.removeprefix(codecs.BOM_UTF8).strip().startswith(b"Date") and b"Title" in line:
                 header_row = i
                 break
 
@@ -334,11 +387,6 @@ def _load_csv(filepath: str) -> pd.DataFrame:
             df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
 
     if "format" not in df.columns and "asin" in df.columns:
-        df["format"] = df["asin"].apply(
-            lambda x: "ebook" if str(x).startswith("B0") else "paperback"
-        )
+        df["format"] = _format_from_asin(df["asin"])
 
-    if "marketplace" in df.columns:
-        df = df[df["marketplace"].eq("Amazon.com")].copy()
-
-    return df
+    return _amazon_com_rows(df)
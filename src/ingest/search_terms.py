@@ -1,7 +1,11 @@
 """Parse Amazon Ads Search Term Report exports (CSV or XLSX)."""
 
+import itertools
+
 import pandas as pd
 
+from src.ingest.common import XLSX_ENGINE, parse_distinct
+
 
 # Map Amazon column names to internal names.
 # Amazon uses "14 Day" attribution windows; we normalize to generic names.
@@ -36,20 +40,39 @@ COLUMN_MAP = {
 
 CSV_HEADER_MARKER = "Campaign Name"
 
+# Low-cardinality label columns stored as categoricals after ingest
+CATEGORY_COLUMNS = ("campaign_name", "match_type")
+
+# Identifier columns always read as text. Chunked reads infer dtypes per chunk,
+# so a chunk of purely numeric ASIN search terms would otherwise lose leading zeros.
+TEXT_COLUMNS = {
+    "Campaign Name": str,
+    "Targeting": str,
+    "Match Type": str,
+    "Customer Search Term": str,
+}
+
 
 def _find_header_row(filepath: str, max_rows: int = 10) -> int:
-    """Scan first N rows to find the actual header row in a CSV."""
-    with open(filepath, "r", encoding="utf-8-sig") as f:
-        for i, line in enumerate(f):
-            if i >= max_rows:
-                break
-            if CSV_HEADER_MARKER in line:
+    """Scan first N rows to find the actual header row in a CSV.
+
+    Lines are matched as raw bytes; nothing past the first N lines is read
+    or decoded.
+    """
+    marker = CSV_HEADER_MARKER.encode()
+    with open(filepath, "rb") as f:
+        for i, line in enumerate(itertools.islice(f, max_rows)):
+            if marker in line:
                 return i
     return 0
 
 
 def _clean_percentage(series: pd.Series) -> pd.Series:
     """Convert percentage strings like '2.50%' to float 0.025."""
+    return parse_distinct(series, _parse_percentage)
+
+
+def _parse_percentage(series: pd.Series) -> pd.Series:
     cleaned = (
         series.astype(str)
         .str.replace("%", "", regex=False)
@@ -61,6 +84,10 @@ def _clean_percentage(series: pd.Series) -> pd.Series:
 
 def _clean_currency(series: pd.Series) -> pd.Series:
     """Convert currency strings like '$0.72' to float 0.72."""
+    return parse_distinct(series, _parse_currency)
+
+
+def _parse_currency(series: pd.Series) -> pd.Series:
     cleaned = (
         series.astype(str)
         .str.replace("$", "", regex=False)
@@ -78,6 +105,10 @@ def _normalize_targeting(series: pd.Series) -> pd.Series:
       asin="B01K1T4U5U"     -> B01K1T4U5U
       asin-expanded="B01K"  -> B01K
     """
+    return parse_distinct(series, _strip_targeting_wrappers)
+
+
+def _strip_targeting_wrappers(series: pd.Series) -> pd.Series:
     return (
         series.astype(str)
         .str.replace('asin-expanded="', "", regex=False)
@@ -87,17 +118,47 @@ def _normalize_targeting(series: pd.Series) -> pd.Series:
     )
 
 
-def load_search_term_report(filepath: str) -> pd.DataFrame:
+def load_search_term_report(filepath: str, chunksize: int = None):
     """Load and normalize an Amazon Search Term Report (CSV or XLSX).
 
     Returns a DataFrame with standardized column names and clean data types.
+    When chunksize is given, returns an iterator of normalized DataFrames
+    instead: CSVs are read chunksize rows at a time, XLSX files are yielded
+    as a single chunk.
     """
+    if chunksize is not None:
+        return _iter_search_term_chunks(filepath, chunksize)
+
     if filepath.endswith((".xlsx", ".xls")):
-        df = pd.read_excel(filepath, engine="openpyxl")
+        df = pd.read_excel(filepath, engine=XLSX_ENGINE)
     else:
         header_row = _find_header_row(filepath)
         df = pd.read_csv(filepath, skiprows=header_row, encoding="utf-8-sig")
 
+    return _normalize_search_terms(df)
+
+
+def _iter_search_term_chunks(filepath: str, chunksize: int):
+    """Yield normalized search term chunks from a report file."""
+    if filepath.endswith((".xlsx", ".xls")):
+        yield load_search_term_report(filepath)
+        return
+
+    header_row = _find_header_row(filepath)
+    reader = pd.read_csv(
+        filepath,
+        skiprows=header_row,
+        encoding="utf-8-sig",
+        dtype=TEXT_COLUMNS,
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            yield _normalize_search_terms(chunk)
+
+
+def _normalize_search_terms(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename Amazon columns and coerce types on a raw search term frame."""
     # Strip whitespace from column names
     df.columns = df.columns.str.strip()
 
@@ -133,4 +194,4 @@ def load_search_term_report(filepath: str) -> pd.DataFrame:
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], errors="coerce")
 
-    return df
+    return df.astype({col: "category" for col in CATEGORY_COLUMNS if col in df.columns})
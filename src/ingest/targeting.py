@@ -8,12 +8,17 @@ Handles three report types:
 
 import pandas as pd
 
+from src.ingest.common import parse_distinct
+
 
 # Data source labels used across the pipeline
 DATA_SOURCE_SEARCH_TERMS = "search_terms"
 DATA_SOURCE_DELTA = "targeting_report_delta"
 DATA_SOURCE_LIFETIME = "targeting_report_lifetime"
 
+# Low-cardinality label columns stored as categoricals after ingest
+CATEGORY_COLUMNS = ("campaign_name", "match_type")
+
 # Standard aggregation for per-target performance metrics
 _METRIC_AGG = {
     "impressions": ("impressions", "sum"),
@@ -26,20 +31,26 @@ _METRIC_AGG = {
 
 def _compute_derived_metrics(df: pd.DataFrame) -> None:
     """Add ctr, cpc, and acos columns to a targeting DataFrame in-place."""
-    df["ctr"] = (df["clicks"] / df["impressions"]).where(df["impressions"] > 0, 0)
-    df["cpc"] = (df["spend"] / df["clicks"]).where(df["clicks"] > 0, 0)
-    df["acos"] = (df["spend"] / df["sales"]).where(df["sales"] > 0, None)
+    # Zero denominators are masked to NaN before dividing, so no inf lanes
+    df["ctr"] = df["clicks"].div(df["impressions"].where(df["impressions"] > 0)).fillna(0)
+    df["cpc"] = df["spend"].div(df["clicks"].where(df["clicks"] > 0)).fillna(0)
+    df["acos"] = df["spend"].div(df["sales"].where(df["sales"] > 0))
 
 
 def enrich_with_bids(df: pd.DataFrame, bid_lookup: dict) -> None:
     """Add bid and suggested bid columns to a targeting DataFrame in-place."""
     if not bid_lookup:
         return
-    bid_data = df["targeting"].map(lambda t: bid_lookup.get(t, {}))
-    df["bid"] = bid_data.map(lambda d: d.get("bid"))
-    df["suggested_bid_low"] = bid_data.map(lambda d: d.get("suggested_bid_low"))
-    df["suggested_bid_median"] = bid_data.map(lambda d: d.get("suggested_bid_median"))
-    df["suggested_bid_high"] = bid_data.map(lambda d: d.get("suggested_bid_high"))
+    bid_cols = ["bid", "suggested_bid_low", "suggested_bid_median", "suggested_bid_high"]
+    # Missing bids (None in the lookup) become NaN so the columns stay float64
+    bid_data = (
+        pd.DataFrame.from_dict(bid_lookup, orient="index")
+        .reindex(columns=bid_cols)
+        .astype("float64")
+        .reindex(df["targeting"].to_numpy())
+    )
+    for col in bid_cols:
+        df[col] = bid_data[col].to_numpy()
 
 
 # Column map for per-campaign targeting report CSVs
@@ -68,7 +79,12 @@ TARGETING_REPORT_COLUMN_MAP = {
     "Purchase rate": "purchase_rate",
 }
 
+
 def _clean_percentage(series: pd.Series) -> pd.Series:
+    return parse_distinct(series, _parse_percentage)
+
+
+def _parse_percentage(series: pd.Series) -> pd.Series:
     return (
         series.astype(str)
         .str.replace("%", "", regex=False)
@@ -81,6 +97,10 @@ def _clean_percentage(series: pd.Series) -> pd.Series:
 
 
 def _clean_currency(series: pd.Series) -> pd.Series:
+    return parse_distinct(series, _parse_currency)
+
+
+def _parse_currency(series: pd.Series) -> pd.Series:
     cleaned = (
         series.astype(str)
         .str.replace("$", "", regex=False)
@@ -93,6 +113,10 @@ def _clean_currency(series: pd.Series) -> pd.Series:
 
 def _normalize_targeting(series: pd.Series) -> pd.Series:
     """Strip ASIN targeting wrappers: asin-expanded="X" and asin="X" -> X."""
+    return parse_distinct(series, _strip_targeting_wrappers)
+
+
+def _strip_targeting_wrappers(series: pd.Series) -> pd.Series:
     return (
         series.astype(str)
         .str.replace('asin-expanded="', "", regex=False)
@@ -129,7 +153,7 @@ def build_targeting_from_search_terms(search_term_df: pd.DataFrame) -> pd.DataFr
         return pd.DataFrame()
 
     grouped = (
-        search_term_df.groupby(["campaign_name", "targeting"])
+        search_term_df.groupby(["campaign_name", "targeting"], observed=True)
         .agg(**_METRIC_AGG)
         .reset_index()
     )
@@ -137,6 +161,10 @@ def build_targeting_from_search_terms(search_term_df: pd.DataFrame) -> pd.DataFr
     _compute_derived_metrics(grouped)
     grouped["targeting_raw"] = grouped["targeting"]
 
+    # Low-cardinality keys: categorical codes speed up downstream isin/groupby
+    grouped["campaign_name"] = grouped["campaign_name"].astype("category")
+    grouped["targeting"] = grouped["targeting"].astype("category")
+
     return grouped
 
 
@@ -163,14 +191,16 @@ def load_targeting_reports(filepaths: list) -> pd.DataFrame:
             print(f"  Warning: Skipping {filepath} — no targeting column found", file=sys.stderr)
             continue
 
-        # Derive match type from raw targeting string
-        df["match_type"] = df.apply(
-            lambda r: _derive_match_type(
-                r.get("targeting_raw", ""),
-                r.get("target_match_type", ""),
-            ),
-            axis=1,
+        # Derive match type from raw targeting string (zipped columns rather
+        # than a row-wise apply, which builds a Series per row)
+        report_match_types = (
+            df["target_match_type"].to_numpy(dtype=object) if "target_match_type" in df.columns
+            else [""] * len(df)
         )
+        df["match_type"] = [
+            _derive_match_type(raw, mt)
+            for raw, mt in zip(df["targeting_raw"].to_numpy(dtype=object), report_match_types)
+        ]
 
         # Normalize targeting (strip asin="..." wrappers)
         df["targeting"] = _normalize_targeting(df["targeting_raw"])
@@ -230,7 +260,8 @@ def load_targeting_reports(filepaths: list) -> pd.DataFrame:
         if col not in result.columns:
             result[col] = default
 
-    return result
+    # Low-cardinality labels: dictionary-encode for cheaper isin/groupby
+    return result.astype({col: "category" for col in CATEGORY_COLUMNS if col in result.columns})
 
 
 def build_target_to_campaign_map(config: dict) -> dict:
@@ -361,7 +392,8 @@ def build_bid_lookup(targeting_report_df: pd.DataFrame) -> dict:
     if targeting_report_df.empty:
         return {}
 
-    df = targeting_report_df.copy()
+    # Read-only: filtering and sorting below build new frames
+    df = targeting_report_df
 
     # Prefer ENABLED rows
     enabled = df[df["state"] == "ENABLED"]
@@ -375,15 +407,25 @@ def build_bid_lookup(targeting_report_df: pd.DataFrame) -> dict:
 
     enabled = enabled.drop_duplicates(subset=["targeting"], keep="first")
 
+    # Walk plain column lists instead of materializing a Series per row
+    def values(col, default):
+        if col in enabled.columns:
+            return enabled[col].tolist()
+        return [default] * len(enabled)
+
     lookup = {}
-    for _, row in enabled.iterrows():
-        targeting = row["targeting"]
-        bid_val = row.get("bid", 0.0)
+    for targeting, bid_val, low, median, high in zip(
+        enabled["targeting"].tolist(),
+        values("bid", 0.0),
+        values("suggested_bid_low", None),
+        values("suggested_bid_median", None),
+        values("suggested_bid_high", None),
+    ):
         lookup[targeting] = {
             "bid": bid_val if bid_val > 0 else None,
-            "suggested_bid_low": row.get("suggested_bid_low") or None,
-            "suggested_bid_median": row.get("suggested_bid_median") or None,
-            "suggested_bid_high": row.get("suggested_bid_high") or None,
+            "suggested_bid_low": low or None,
+            "suggested_bid_median": median or None,
+            "suggested_bid_high": high or None,
         }
 
     return lookup
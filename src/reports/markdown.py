@@ -1,12 +1,16 @@
 """Markdown file writer for weekly reports."""
 
+import functools
 import os
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from src.ingest.targeting import DATA_SOURCE_SEARCH_TERMS, DATA_SOURCE_DELTA, DATA_SOURCE_LIFETIME
 
+SECTION_SEPARATOR = "\n---\n"
+
 
 def _data_source_label(source: str) -> str:
     """Convert a data_source value to a display label."""
@@ -35,13 +39,67 @@ def _fmt_int(val) -> str:
     return f"{int(val):,}"
 
 
-def _md_table(headers: list, rows: list) -> str:
-    """Build a markdown table from headers and row data."""
-    lines = []
-    lines.append("| " + " | ".join(headers) + " |")
-    lines.append("| " + " | ".join(["---"] * len(headers)) + " |")
-    for row in rows:
-        lines.append("| " + " | ".join(str(v) for v in row) + " |")
+def _fmt_series(s: pd.Series, fmt, missing="—") -> np.ndarray:
+    """Format a whole column at once: fmt on present values, missing on the rest."""
+    vals = s.to_numpy()
+    mask = pd.isna(vals)
+    # Bids, CPCs and zero counts repeat across rows, so each distinct value
+    # is formatted once and broadcast back
+    codes, uniques = pd.factorize(vals[~mask])
+    out = np.empty(len(vals), dtype=object)
+    out[~mask] = np.array([fmt(v) for v in uniques.tolist()], dtype=object)[codes]
+    out[mask] = missing
+    return out
+
+
+def _fmt_pct_series(s: pd.Series, decimals=2) -> np.ndarray:
+    return _fmt_series(s, lambda v: f"{v * 100:.{decimals}f}%")
+
+
+def _fmt_dollar_series(s: pd.Series) -> np.ndarray:
+    return _fmt_series(s, lambda v: f"${v:.2f}")
+
+
+def _fmt_int_series(s: pd.Series) -> np.ndarray:
+    return _fmt_series(s, lambda v: f"{int(v):,}")
+
+
+def _str_column(s) -> list:
+    """Stringify a text column once so it can go straight into a table."""
+    return list(map(str, s))
+
+
+def _column(df: pd.DataFrame, col: str, default=None) -> pd.Series:
+    """Return df[col], or a column of default when df doesn't have it."""
+    if col in df.columns:
+        return df[col]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+
+def _flag_lines(flags: list) -> list:
+    """Render flags as markdown bullets, warnings marked with !!!."""
+    return [
+        f"- {'!!!' if f['severity'] == 'warning' else '>'} {f['message']}\n"
+        for f in flags
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _md_separator(n_columns: int) -> str:
+    return "| " + " | ".join(["---"] * n_columns) + " |"
+
+
+def _md_table(headers: list, rows: list, *, stringify=True) -> str:
+    """Build a markdown table from headers and row data.
+
+    Pass stringify=False when every cell is already a str (columns built
+    with the _fmt_*_series helpers and _str_column) to skip the str() call
+    per cell.
+    """
+    lines = ["| " + " | ".join(headers) + " |", _md_separator(len(headers))]
+    if stringify:
+        rows = (map(str, row) for row in rows)
+    lines.extend(["| " + " | ".join(row) + " |" for row in rows])
     return "\n".join(lines)
 
 
@@ -52,31 +110,27 @@ def _campaign_summary_section(result: dict) -> str:
     headers = ["Campaign", "Spend", "Impr", "Clicks", "CTR", "Avg CPC", "Orders", "Sales", "ACoS", "ROAS"]
     if has_supplemental:
         headers.append("Source")
-    rows = []
-    for _, row in df.iterrows():
-        roas_val = row.get("roas")
-        roas_str = f"{roas_val:.2f}x" if roas_val is not None and pd.notna(roas_val) else "—"
-        r = [
-            row["campaign_name"],
-            _fmt_dollar(row["spend"]),
-            _fmt_int(row["impressions"]),
-            _fmt_int(row["clicks"]),
-            _fmt_pct(row["ctr"]),
-            _fmt_dollar(row["avg_cpc"]),
-            _fmt_int(row["orders"]),
-            _fmt_dollar(row["sales"]),
-            _fmt_pct(row.get("acos")),
-            roas_str,
-        ]
-        if has_supplemental:
-            r.append(_data_source_label(row.get("data_source", DATA_SOURCE_SEARCH_TERMS)))
-        rows.append(r)
+    columns = [
+        _str_column(df["campaign_name"]),
+        _fmt_dollar_series(df["spend"]),
+        _fmt_int_series(df["impressions"]),
+        _fmt_int_series(df["clicks"]),
+        _fmt_pct_series(df["ctr"]),
+        _fmt_dollar_series(df["avg_cpc"]),
+        _fmt_int_series(df["orders"]),
+        _fmt_dollar_series(df["sales"]),
+        _fmt_pct_series(_column(df, "acos")),
+        _fmt_series(_column(df, "roas"), lambda v: f"{v:.2f}x"),
+    ]
+    if has_supplemental:
+        columns.append([_data_source_label(source) for source in df["data_source"]])
+    rows = zip(*columns)
 
-    section = "## 1. Campaign Summary\n\n" + _md_table(headers, rows)
+    parts = ["## 1. Campaign Summary\n\n" + _md_table(headers, rows, stringify=False)]
     if has_supplemental:
-        section += "\n\n> *delta*: weekly activity derived from targeting report week-over-week difference. "
-        section += "*lifetime\\**: no prior snapshot — showing cumulative since campaign start."
-    return section
+        parts.append("\n\n> *delta*: weekly activity derived from targeting report week-over-week difference. ")
+        parts.append("*lifetime\\**: no prior snapshot — showing cumulative since campaign start.")
+    return "".join(parts)
 
 
 def _asin_performance_section(result: dict) -> str:
@@ -84,47 +138,46 @@ def _asin_performance_section(result: dict) -> str:
     df = result["table"]
     flags = result["flags"]
 
-    if df.empty:
+    if len(df) == 0:
         return "## 2. ASIN Target Performance\n\nNo ASIN targeting data."
 
     headers = ["Target", "Impr", "Clicks", "CTR", "CPC", "Spend", "Orders", "Conv Rate"]
-    rows = []
-    for _, row in df.iterrows():
-        title = row.get("target_title", "")
-        display = f"{title} ({row['targeting']})" if title else row["targeting"]
-        rows.append([
-            display,
-            _fmt_int(row["impressions"]),
-            _fmt_int(row["clicks"]),
-            _fmt_pct(row.get("ctr")),
-            _fmt_dollar(row.get("cpc")),
-            _fmt_dollar(row["spend"]),
-            _fmt_int(row["orders"]),
-            _fmt_pct(row.get("conversion_rate")),
-        ])
-
-    section = "## 2. ASIN Target Performance\n\n" + _md_table(headers, rows)
+    display = [
+        f"{title} ({targeting})" if title else str(targeting)
+        for title, targeting in zip(_column(df, "target_title", ""), df["targeting"])
+    ]
+    rows = zip(
+        display,
+        _fmt_int_series(df["impressions"]),
+        _fmt_int_series(df["clicks"]),
+        _fmt_pct_series(_column(df, "ctr")),
+        _fmt_dollar_series(_column(df, "cpc")),
+        _fmt_dollar_series(df["spend"]),
+        _fmt_int_series(df["orders"]),
+        _fmt_pct_series(_column(df, "conversion_rate")),
+    )
+
+    parts = ["## 2. ASIN Target Performance\n\n" + _md_table(headers, rows, stringify=False)]
 
     if flags:
-        section += "\n\n**Flags:**\n"
-        for f in flags:
-            icon = "!!!" if f["severity"] == "warning" else ">"
-            section += f"- {icon} {f['message']}\n"
+        parts.append("\n\n**Flags:**\n")
+        parts.extend(_flag_lines(flags))
 
     zero_activity = result.get("zero_activity_targets", [])
     if zero_activity:
-        section += "\n### Targets with No Clicks\n\n"
+        parts.append("\n### Targets with No Clicks\n\n")
         za_headers = ["ASIN", "Title", "Lifetime Impr", "Bid"]
-        za_rows = []
-        for t in zero_activity:
-            za_rows.append([
+        za_rows = [
+            [
                 t["asin"], t["title"],
                 _fmt_int(t.get("lifetime_impressions", 0)),
                 _fmt_dollar(t.get("bid")),
-            ])
-        section += _md_table(za_headers, za_rows) + "\n"
+            ]
+            for t in zero_activity
+        ]
+        parts.append(_md_table(za_headers, za_rows) + "\n")
 
-    return section
+    return "".join(parts)
 
 
 def _keyword_performance_section(result: dict) -> str:
@@ -132,32 +185,28 @@ def _keyword_performance_section(result: dict) -> str:
     df = result["table"]
     flags = result["flags"]
 
-    if df.empty:
+    if len(df) == 0:
         return "## 3. Keyword Performance\n\nNo keyword targeting data."
 
     headers = ["Keyword", "Match", "Impr", "Clicks", "CTR", "CPC", "Spend", "Orders"]
-    rows = []
-    for _, row in df.iterrows():
-        rows.append([
-            row["targeting"],
-            row.get("match_type", ""),
-            _fmt_int(row["impressions"]),
-            _fmt_int(row["clicks"]),
-            _fmt_pct(row.get("ctr")),
-            _fmt_dollar(row.get("cpc")),
-            _fmt_dollar(row["spend"]),
-            _fmt_int(row["orders"]),
-        ])
-
-    section = "## 3. Keyword Performance\n\n" + _md_table(headers, rows)
+    rows = zip(
+        _str_column(df["targeting"]),
+        _str_column(_column(df, "match_type", "")),
+        _fmt_int_series(df["impressions"]),
+        _fmt_int_series(df["clicks"]),
+        _fmt_pct_series(_column(df, "ctr")),
+        _fmt_dollar_series(_column(df, "cpc")),
+        _fmt_dollar_series(df["spend"]),
+        _fmt_int_series(df["orders"]),
+    )
+
+    parts = ["## 3. Keyword Performance\n\n" + _md_table(headers, rows, stringify=False)]
 
     if flags:
-        section += "\n\n**Flags:**\n"
-        for f in flags:
-            icon = "!!!" if f["severity"] == "warning" else ">"
-            section += f"- {icon} {f['message']}\n"
+        parts.append("\n\n**Flags:**\n")
+        parts.extend(_flag_lines(flags))
 
-    return section
+    return "".join(parts)
 
 
 def _search_term_section(result: dict) -> str:
@@ -166,33 +215,30 @@ def _search_term_section(result: dict) -> str:
     drift_flags = result.get("drift_flags", [])
     transition_note = result.get("transition_note", "")
 
-    section = "## 4. Search Term Analysis\n\n"
+    parts = ["## 4. Search Term Analysis\n\n"]
 
     if transition_note:
-        section += f"> {transition_note}\n\n"
+        parts.append(f"> {transition_note}\n\n")
 
     if drift_flags:
-        section += "### Drift Detected\n\n"
-        for f in drift_flags:
-            icon = "!!!" if f["severity"] == "warning" else ">"
-            section += f"- {icon} {f['message']}\n"
-        section += "\n"
-
-    if not summary.empty:
-        section += "### Top Search Terms (by spend)\n\n"
+        parts.append("### Drift Detected\n\n")
+        parts.extend(_flag_lines(drift_flags))
+        parts.append("\n")
+
+    if len(summary) > 0:
+        parts.append("### Top Search Terms (by spend)\n\n")
         headers = ["Search Term", "Impr", "Clicks", "Spend", "Orders"]
-        rows = []
-        for _, row in summary.head(20).iterrows():
-            rows.append([
-                str(row["search_term"]),
-                _fmt_int(row["impressions"]),
-                _fmt_int(row["clicks"]),
-                _fmt_dollar(row["spend"]),
-                _fmt_int(row["orders"]),
-            ])
-        section += _md_table(headers, rows)
+        top = summary.head(20)
+        rows = zip(
+            _str_column(top["search_term"]),
+            _fmt_int_series(top["impressions"]),
+            _fmt_int_series(top["clicks"]),
+            _fmt_dollar_series(top["spend"]),
+            _fmt_int_series(top["orders"]),
+        )
+        parts.append(_md_table(headers, rows, stringify=False))
 
-    return section
+    return "".join(parts)
 
 
 def _kdp_section(result: dict) -> str:
@@ -204,70 +250,76 @@ def _kdp_section(result: dict) -> str:
     paired = result.get("paired_purchases", [])
     ad_influenced = result.get("ad_influenced")
 
-    section = "## 5. KDP Sales Reconciliation\n\n"
+    parts = ["## 5. KDP Sales Reconciliation\n\n"]
 
     # Title x Format breakdown (preferred) or title-only fallback
-    if not title_format_breakdown.empty:
+    if len(title_format_breakdown) > 0:
         headers = ["Title", "Format", "Units", "Royalty"]
-        rows = []
-        for _, row in title_format_breakdown.iterrows():
-            rows.append([row["title"], row["format"], _fmt_int(row["units"]), _fmt_dollar(row["royalty"])])
-        section += _md_table(headers, rows) + "\n\n"
-    elif not title_totals.empty:
+        rows = zip(
+            _str_column(title_format_breakdown["title"]),
+            _str_column(title_format_breakdown["format"]),
+            _fmt_int_series(title_format_breakdown["units"]),
+            _fmt_dollar_series(title_format_breakdown["royalty"]),
+        )
+        parts.append(_md_table(headers, rows, stringify=False) + "\n\n")
+    elif len(title_totals) > 0:
         headers = ["Title", "Units", "Royalty"]
-        rows = []
-        for _, row in title_totals.iterrows():
-            rows.append([row["title"], _fmt_int(row["units"]), _fmt_dollar(row["royalty"])])
-        section += _md_table(headers, rows) + "\n\n"
+        rows = zip(
+            _str_column(title_totals["title"]),
+            _fmt_int_series(title_totals["units"]),
+            _fmt_dollar_series(title_totals["royalty"]),
+        )
+        parts.append(_md_table(headers, rows, stringify=False) + "\n\n")
 
     # Paired purchases
     if paired:
-        section += "### Paired Purchases Detected\n\n"
-        section += "Same-day Book 1 + Book 2 purchases (likely ad-driven):\n\n"
+        parts.append("### Paired Purchases Detected\n\n")
+        parts.append("Same-day Book 1 + Book 2 purchases (likely ad-driven):\n\n")
         for p in paired:
-            section += f"- **{p['date']}**: {p['details']}\n"
-        section += "\n"
+            parts.append(f"- **{p['date']}**: {p['details']}\n")
+        parts.append("\n")
 
     # Attribution gap
-    section += "### Attribution Gap\n\n"
-    section += f"- **KDP Total Units**: {totals.get('kdp_units', 0)}\n"
-    section += f"- **Ad-Attributed Orders**: {totals.get('ad_attributed_orders', 0)}\n"
-    section += f"- **Unattributed Sales**: {totals.get('attribution_gap', 0)} ({totals.get('attribution_gap_pct', 0):.1f}%)\n"
-    section += f"- **KDP Royalty**: {_fmt_dollar(totals.get('kdp_royalty', 0))}\n"
+    parts.append("### Attribution Gap\n\n")
+    parts.append(f"- **KDP Total Units**: {totals.get('kdp_units', 0)}\n")
+    parts.append(f"- **Ad-Attributed Orders**: {totals.get('ad_attributed_orders', 0)}\n")
+    parts.append(f"- **Unattributed Sales**: {totals.get('attribution_gap', 0)} ({totals.get('attribution_gap_pct', 0):.1f}%)\n")
+    parts.append(f"- **KDP Royalty**: {_fmt_dollar(totals.get('kdp_royalty', 0))}\n")
 
     if gap.get("note"):
-        section += f"\n> {gap['note']}\n"
+        parts.append(f"\n> {gap['note']}\n")
 
     # Ad-influenced analysis
     if ad_influenced:
         inf = ad_influenced
         spend = inf.get("ad_spend", 0)
 
-        section += "\n### Ad-Influenced Analysis\n\n"
-        section += f"Since ads started ({inf.get('ads_start', 'N/A')}):\n\n"
-        section += f"- **Total KDP units** (all books/formats): {inf.get('post_ad_units', 0)}\n"
-        section += f"- **Total KDP royalty**: {_fmt_dollar(inf.get('post_ad_royalty', 0))}\n"
-        section += f"- **Total ad spend**: {_fmt_dollar(spend)}\n"
+        parts.append("\n### Ad-Influenced Analysis\n\n")
+        parts.append(f"Since ads started ({inf.get('ads_start', 'N/A')}):\n\n")
+        parts.append(f"- **Total KDP units** (all books/formats): {inf.get('post_ad_units', 0)}\n")
+        parts.append(f"- **Total KDP royalty**: {_fmt_dollar(inf.get('post_ad_royalty', 0))}\n")
+        parts.append(f"- **Total ad spend**: {_fmt_dollar(spend)}\n")
 
         attr_roas = inf.get("attributed_roas")
         inf_roas = inf.get("influenced_roas")
-        section += f"- **Amazon-Attributed ROAS**: {f'{attr_roas:.2f}x' if attr_roas is not None else '—'}\n"
-        section += f"- **Ad-Influenced ROAS**: {f'{inf_roas:.2f}x' if inf_roas is not None else '—'} (KDP royalty / ad spend)\n"
+        parts.append(f"- **Amazon-Attributed ROAS**: {f'{attr_roas:.2f}x' if attr_roas is not None else '—'}\n")
+        parts.append(f"- **Ad-Influenced ROAS**: {f'{inf_roas:.2f}x' if inf_roas is not None else '—'} (KDP royalty / ad spend)\n")
 
         breakdown = inf.get("post_ad_breakdown", [])
         if breakdown:
-            section += "\n**Post-Ad Sales Breakdown:**\n\n"
+            parts.append("\n**Post-Ad Sales Breakdown:**\n\n")
             headers = ["Title", "Format", "Units", "Royalty"]
-            rows = []
-            for item in breakdown:
-                rows.append([item["title"], item["format"], _fmt_int(item["units"]), _fmt_dollar(item["royalty"])])
-            section += _md_table(headers, rows) + "\n"
+            rows = [
+                [item["title"], item["format"], _fmt_int(item["units"]), _fmt_dollar(item["royalty"])]
+                for item in breakdown
+            ]
+            parts.append(_md_table(headers, rows) + "\n")
 
         inf_note = inf.get("note", "")
         if inf_note:
-            section += f"\n> {inf_note}\n"
+            parts.append(f"\n> {inf_note}\n")
 
-    return section
+    return "".join(parts)
 
 
 def _bid_section(result: dict) -> str:
@@ -275,32 +327,28 @@ def _bid_section(result: dict) -> str:
     df = result["table"]
     flags = result["flags"]
 
-    if df.empty:
+    if len(df) == 0:
         return "## 6. Bid Recommendations\n\nNo bid recommendation data."
 
     headers = ["Target", "Campaign", "Clicks", "Orders", "Conv Rate", "Current Bid", "Suggested", "Max Bid"]
-    rows = []
-    for _, row in df.iterrows():
-        rows.append([
-            row["targeting"],
-            row.get("campaign_name", ""),
-            _fmt_int(row["clicks"]),
-            _fmt_int(row["orders"]),
-            _fmt_pct(row.get("conversion_rate")),
-            _fmt_dollar(row.get("current_bid")),
-            _fmt_dollar(row.get("suggested_bid")),
-            _fmt_dollar(row.get("max_profitable_bid")),
-        ])
-
-    section = "## 6. Bid Recommendations\n\n" + _md_table(headers, rows)
+    rows = zip(
+        _str_column(df["targeting"]),
+        _str_column(_column(df, "campaign_name", "")),
+        _fmt_int_series(df["clicks"]),
+        _fmt_int_series(df["orders"]),
+        _fmt_pct_series(_column(df, "conversion_rate")),
+        _fmt_dollar_series(_column(df, "current_bid")),
+        _fmt_dollar_series(_column(df, "suggested_bid")),
+        _fmt_dollar_series(_column(df, "max_profitable_bid")),
+    )
+
+    parts = ["## 6. Bid Recommendations\n\n" + _md_table(headers, rows, stringify=False)]
 
     if flags:
-        section += "\n\n**Flags:**\n"
-        for f in flags:
-            icon = "!!!" if f["severity"] == "warning" else ">"
-            section += f"- {icon} {f['message']}\n"
+        parts.append("\n\n**Flags:**\n")
+        parts.extend(_flag_lines(flags))
 
-    return section
+    return "".join(parts)
 
 
 def _action_items_section(all_flags: list) -> str:
@@ -308,22 +356,25 @@ def _action_items_section(all_flags: list) -> str:
     if not all_flags:
         return "## Action Items\n\nNo action items — all targets performing within thresholds."
 
-    warnings = [f for f in all_flags if f.get("severity") == "warning"]
-    infos = [f for f in all_flags if f.get("severity") == "info"]
+    # One pass over the flags; severities other than these two are not listed
+    by_severity = {"warning": [], "info": []}
+    for f in all_flags:
+        bucket = by_severity.get(f.get("severity"))
+        if bucket is not None:
+            bucket.append(f"- {f['message']}\n")
+    warnings, infos = by_severity["warning"], by_severity["info"]
 
-    section = "## Action Items\n\n"
+    parts = ["## Action Items\n\n"]
     if warnings:
-        section += "### Warnings\n\n"
-        for f in warnings:
-            section += f"- {f['message']}\n"
-        section += "\n"
+        parts.append("### Warnings\n\n")
+        parts.extend(warnings)
+        parts.append("\n")
 
     if infos:
-        section += "### Info\n\n"
-        for f in infos:
-            section += f"- {f['message']}\n"
+        parts.append("### Info\n\n")
+        parts.extend(infos)
 
-    return section
+    return "".join(parts)
 
 
 def write_weekly_report(
@@ -348,50 +399,54 @@ def write_weekly_report(
     filepath = os.path.join(output_dir, filename)
 
     # Front matter
+    now = datetime.now()
     lines = [
         f"# Weekly Ad Report — Week of {week}",
     ]
     if week_start and week_end:
         lines.append(f"**Report period**: {week_start} to {week_end}")
     lines += [
-        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+        f"Generated: {now.year:04}-{now.month:02}-{now.day:02} {now.hour:02}:{now.minute:02}",
         "",
     ]
 
     # Total spend/orders from campaign summary
     summary_table = campaign_summary.get("table", pd.DataFrame())
-    if not summary_table.empty:
-        total_spend = summary_table["spend"].sum()
-        total_orders = summary_table["orders"].sum()
+    if len(summary_table) > 0:
+        total_spend, total_orders = summary_table[["spend", "orders"]].sum()
         lines.append(f"**Total Spend**: {_fmt_dollar(total_spend)} | **Total Orders**: {_fmt_int(total_orders)}")
         lines.append("")
 
     lines.append("---\n")
 
-    # Sections
-    lines.append(_campaign_summary_section(campaign_summary))
-    lines.append("\n---\n")
-    lines.append(_asin_performance_section(asin_performance))
-    lines.append("\n---\n")
-    lines.append(_keyword_performance_section(keyword_performance))
-    lines.append("\n---\n")
-    lines.append(_search_term_section(search_term_analysis))
-    lines.append("\n---\n")
-    lines.append(_kdp_section(kdp_reconciliation))
-    lines.append("\n---\n")
-    lines.append(_bid_section(bid_recommendations))
-    lines.append("\n---\n")
-
-    # Action items
     all_flags = (
         asin_performance.get("flags", [])
         + keyword_performance.get("flags", [])
         + search_term_analysis.get("drift_flags", [])
         + bid_recommendations.get("flags", [])
     )
-    lines.append(_action_items_section(all_flags))
+    separator = f"\n{SECTION_SEPARATOR}\n".encode("utf-8")
+
+    # Build every section before opening the file, so a failing builder
+    # leaves the previous report untouched
+    sections = [
+        _campaign_summary_section(campaign_summary),
+        _asin_performance_section(asin_performance),
+        _keyword_performance_section(keyword_performance),
+        _search_term_section(search_term_analysis),
+        _kdp_section(kdp_reconciliation),
+        _bid_section(bid_recommendations),
+    ]
+    action_items = _action_items_section(all_flags)
+
+    with open(filepath, "wb", buffering=1 << 16) as f:
+        write = f.write
+        write("\n".join(lines).encode("utf-8") + b"\n")
+        for section in sections:
+            write(section.encode("utf-8"))
+            write(separator)
 
-    with open(filepath, "w") as f:
-        f.write("\n".join(lines))
+        # Action items
+        write(action_items.encode("utf-8"))
 
     return filepath
@@ -1,17 +1,60 @@
 """Rich terminal output for weekly reports."""
 
+import sys
+
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
+import numpy as np
 import pandas as pd
 
 from src.ingest.targeting import DATA_SOURCE_SEARCH_TERMS
-from src.reports.markdown import _data_source_label
+from src.reports.markdown import (
+    _column,
+    _data_source_label,
+    _fmt_dollar_series,
+    _fmt_int_series,
+    _fmt_pct_series,
+    _fmt_series,
+    _str_column,
+)
 
 console = Console()
 
+_SEVERITY_COLOR = {"warning": "red"}
+_DEFAULT_SEVERITY_COLOR = "yellow"
+
+
+def _plain(renderable) -> str:
+    """Plain-text form of a renderable, for output that is not a terminal."""
+    if isinstance(renderable, Table):
+        lines = [renderable.title] if renderable.title else []
+        columns = renderable.columns
+        lines.append("\t".join(str(c.header) for c in columns))
+        for cells in zip(*(c.cells for c in columns)):
+            lines.append("\t".join(_plain(cell).replace("\n", " ") for cell in cells))
+        return "\n".join(lines)
+    if isinstance(renderable, Panel):
+        body = _plain(renderable.renderable)
+        return f"{renderable.title}\n{body}" if renderable.title else body
+    if isinstance(renderable, Text):
+        return renderable.plain
+    return Text.from_markup(renderable).plain
+
+
+def _print(renderable="") -> None:
+    """Print through Rich on a terminal; otherwise write plain text directly.
+
+    When output is piped or captured, the styling, width measurement and
+    borders Rich computes are discarded anyway, so they are skipped.
+    """
+    if console.is_terminal:
+        console.print(renderable)
+    else:
+        sys.stdout.write(_plain(renderable) + "\n")
+
 
 def _fmt_pct(val, decimals=2) -> str:
     if val is None or pd.isna(val):
@@ -39,6 +82,24 @@ def _delta_str(val, fmt_func, invert=False) -> str:
     return f" ({prefix}{fmt_func(val)})"
 
 
+def _delta_series(s: pd.Series, fmt_func) -> np.ndarray:
+    """Column-wise _delta_str: missing deltas format as an empty string."""
+    return _fmt_series(s, lambda v: _delta_str(v, fmt_func), missing="")
+
+
+def _flag_texts(flags: list, separator: str = "") -> dict:
+    """Build each target's flag labels once, in flag order.
+
+    Returns:
+        dict mapping target to a Text of colored [type] labels.
+    """
+    labels = {}
+    for f in flags:
+        color = _SEVERITY_COLOR.get(f["severity"], _DEFAULT_SEVERITY_COLOR)
+        labels.setdefault(f["target"], []).append((f"[{f['type']}]{separator}", color))
+    return {target: Text.assemble(*parts) for target, parts in labels.items()}
+
+
 def render_campaign_summary(result: dict) -> None:
     """Render campaign summary table to terminal."""
     df = result["table"]
@@ -59,45 +120,40 @@ def render_campaign_summary(result: dict) -> None:
     if has_supplemental:
         table.add_column("Source", style="dim")
 
-    for _, row in df.iterrows():
-        spend_str = _fmt_dollar(row["spend"])
-        if wow and "spend_delta" in row.index:
-            spend_str += _delta_str(row["spend_delta"], _fmt_dollar)
-
-        ctr_str = _fmt_pct(row["ctr"])
-        if wow and "ctr_delta" in row.index:
-            ctr_str += _delta_str(row["ctr_delta"], _fmt_pct)
-
-        acos_str = _fmt_pct(row.get("acos"))
-        orders_str = _fmt_int(row["orders"])
-        if wow and "orders_delta" in row.index:
-            orders_str += _delta_str(row["orders_delta"], _fmt_int)
-
-        roas_val = row.get("roas")
-        roas_str = f"{roas_val:.2f}x" if roas_val is not None and pd.notna(roas_val) else "—"
-
-        cells = [
-            row["campaign_name"],
-            spend_str,
-            _fmt_int(row["impressions"]),
-            _fmt_int(row["clicks"]),
-            ctr_str,
-            _fmt_dollar(row["avg_cpc"]),
-            orders_str,
-            _fmt_dollar(row["sales"]),
-            acos_str,
-            roas_str,
-        ]
-        if has_supplemental:
-            cells.append(_data_source_label(row.get("data_source", DATA_SOURCE_SEARCH_TERMS)))
+    # Format each column once; week-over-week deltas are appended column-wise
+    spend_col = _fmt_dollar_series(df["spend"])
+    if wow and "spend_delta" in df.columns:
+        spend_col = spend_col + _delta_series(df["spend_delta"], _fmt_dollar)
+    ctr_col = _fmt_pct_series(df["ctr"])
+    if wow and "ctr_delta" in df.columns:
+        ctr_col = ctr_col + _delta_series(df["ctr_delta"], _fmt_pct)
+    orders_col = _fmt_int_series(df["orders"])
+    if wow and "orders_delta" in df.columns:
+        orders_col = orders_col + _delta_series(df["orders_delta"], _fmt_int)
+
+    columns = [
+        df["campaign_name"],
+        spend_col,
+        _fmt_int_series(df["impressions"]),
+        _fmt_int_series(df["clicks"]),
+        ctr_col,
+        _fmt_dollar_series(df["avg_cpc"]),
+        orders_col,
+        _fmt_dollar_series(df["sales"]),
+        _fmt_pct_series(_column(df, "acos")),
+        _fmt_series(_column(df, "roas"), lambda v: f"{v:.2f}x"),
+    ]
+    if has_supplemental:
+        columns.append([_data_source_label(source) for source in df["data_source"]])
 
+    for cells in zip(*columns):
         table.add_row(*cells)
 
-    console.print(table)
+    _print(table)
     if has_supplemental:
-        console.print("[dim]  delta = weekly activity from targeting report WoW diff. "
+        _print("[dim]  delta = weekly activity from targeting report WoW diff. "
                        "lifetime* = no prior snapshot — showing cumulative since campaign start.[/dim]")
-    console.print()
+    _print()
 
 
 def render_asin_performance(result: dict) -> None:
@@ -106,7 +162,7 @@ def render_asin_performance(result: dict) -> None:
     flags = result["flags"]
 
     if df.empty:
-        console.print("[dim]No ASIN targeting data.[/dim]")
+        _print("[dim]No ASIN targeting data.[/dim]")
         return
 
     table = Table(title="ASIN Target Performance", show_lines=True)
@@ -121,35 +177,26 @@ def render_asin_performance(result: dict) -> None:
     table.add_column("Flags", max_width=20)
 
     # Build flag lookup
-    flag_map = {}
-    for f in flags:
-        target = f["target"]
-        flag_map.setdefault(target, []).append(f)
-
-    for _, row in df.iterrows():
-        target = row["targeting"]
-        title = row.get("target_title", "")
+    flag_texts = _flag_texts(flags)
+
+    rows = zip(
+        df["targeting"],
+        _column(df, "target_title", ""),
+        _fmt_int_series(df["impressions"]),
+        _fmt_int_series(df["clicks"]),
+        _fmt_pct_series(_column(df, "ctr")),
+        _fmt_dollar_series(_column(df, "cpc")),
+        _fmt_dollar_series(df["spend"]),
+        _fmt_int_series(df["orders"]),
+        _fmt_pct_series(_column(df, "conversion_rate")),
+    )
+    for target, title, *cells in rows:
         display = f"{title}\n{target}" if title else target
 
-        target_flags = flag_map.get(target, [])
-        flag_text = Text()
-        for f in target_flags:
-            color = "red" if f["severity"] == "warning" else "yellow"
-            flag_text.append(f"[{f['type']}]", style=color)
-
-        table.add_row(
-            display,
-            _fmt_int(row["impressions"]),
-            _fmt_int(row["clicks"]),
-            _fmt_pct(row.get("ctr")),
-            _fmt_dollar(row.get("cpc")),
-            _fmt_dollar(row["spend"]),
-            _fmt_int(row["orders"]),
-            _fmt_pct(row.get("conversion_rate")),
-            flag_text,
-        )
+        flag_text = flag_texts[target] if target in flag_texts else Text()
+        table.add_row(display, *cells, flag_text)
 
-    console.print(table)
+    _print(table)
 
     # Zero-activity targets (configured but absent from targeting data)
     zero_activity = result.get("zero_activity_targets", [])
@@ -169,9 +216,9 @@ def render_asin_performance(result: dict) -> None:
                 _fmt_int(t.get("lifetime_impressions", 0)),
                 _fmt_dollar(t.get("bid")),
             )
-        console.print(za_table)
+        _print(za_table)
 
-    console.print()
+    _print()
 
 
 def render_keyword_performance(result: dict) -> None:
@@ -180,7 +227,7 @@ def render_keyword_performance(result: dict) -> None:
     flags = result["flags"]
 
     if df.empty:
-        console.print("[dim]No keyword targeting data.[/dim]")
+        _print("[dim]No keyword targeting data.[/dim]")
         return
 
     table = Table(title="Keyword Performance", show_lines=True)
@@ -194,32 +241,24 @@ def render_keyword_performance(result: dict) -> None:
     table.add_column("Orders", justify="right")
     table.add_column("Flags", max_width=20)
 
-    flag_map = {}
-    for f in flags:
-        flag_map.setdefault(f["target"], []).append(f)
-
-    for _, row in df.iterrows():
-        keyword = row["targeting"]
-        target_flags = flag_map.get(keyword, [])
-        flag_text = Text()
-        for f in target_flags:
-            color = "red" if f["severity"] == "warning" else "yellow"
-            flag_text.append(f"[{f['type']}]", style=color)
-
-        table.add_row(
-            keyword,
-            row.get("match_type", ""),
-            _fmt_int(row["impressions"]),
-            _fmt_int(row["clicks"]),
-            _fmt_pct(row.get("ctr")),
-            _fmt_dollar(row.get("cpc")),
-            _fmt_dollar(row["spend"]),
-            _fmt_int(row["orders"]),
-            flag_text,
-        )
+    flag_texts = _flag_texts(flags)
+
+    rows = zip(
+        df["targeting"],
+        _column(df, "match_type", ""),
+        _fmt_int_series(df["impressions"]),
+        _fmt_int_series(df["clicks"]),
+        _fmt_pct_series(_column(df, "ctr")),
+        _fmt_dollar_series(_column(df, "cpc")),
+        _fmt_dollar_series(df["spend"]),
+        _fmt_int_series(df["orders"]),
+    )
+    for keyword, *cells in rows:
+        flag_text = flag_texts[keyword] if keyword in flag_texts else Text()
+        table.add_row(keyword, *cells, flag_text)
 
-    console.print(table)
-    console.print()
+    _print(table)
+    _print()
 
 
 def render_search_term_analysis(result: dict) -> None:
@@ -229,15 +268,15 @@ def render_search_term_analysis(result: dict) -> None:
     transition_note = result.get("transition_note", "")
 
     if transition_note:
-        console.print(Panel(transition_note, title="Context", style="dim"))
+        _print(Panel(transition_note, title="Context", style="dim"))
 
     # Drift flags
     if drift_flags:
-        console.print(Panel("[bold red]Drift Detected[/bold red]", expand=False))
+        _print(Panel("[bold red]Drift Detected[/bold red]", expand=False))
         for f in drift_flags:
-            color = "red" if f["severity"] == "warning" else "yellow"
-            console.print(f"  [{color}]{f['message']}[/{color}]")
-        console.print()
+            color = _SEVERITY_COLOR.get(f["severity"], _DEFAULT_SEVERITY_COLOR)
+            _print(f"  [{color}]{f['message']}[/{color}]")
+        _print()
 
     # Top search terms
     if not summary.empty:
@@ -248,17 +287,19 @@ def render_search_term_analysis(result: dict) -> None:
         table.add_column("Spend", justify="right")
         table.add_column("Orders", justify="right")
 
-        for _, row in summary.head(20).iterrows():
-            table.add_row(
-                str(row["search_term"]),
-                _fmt_int(row["impressions"]),
-                _fmt_int(row["clicks"]),
-                _fmt_dollar(row["spend"]),
-                _fmt_int(row["orders"]),
-            )
+        top = summary.head(20)
+        rows = zip(
+            _str_column(top["search_term"]),
+            _fmt_int_series(top["impressions"]),
+            _fmt_int_series(top["clicks"]),
+            _fmt_dollar_series(top["spend"]),
+            _fmt_int_series(top["orders"]),
+        )
+        for cells in rows:
+            table.add_row(*cells)
 
-        console.print(table)
-        console.print()
+        _print(table)
+        _print()
 
 
 def render_kdp_reconciliation(result: dict) -> None:
@@ -278,36 +319,38 @@ def render_kdp_reconciliation(result: dict) -> None:
         table.add_column("Units", justify="right")
         table.add_column("Royalty", justify="right")
 
-        for _, row in title_format_breakdown.iterrows():
-            table.add_row(
-                row["title"],
-                row["format"],
-                _fmt_int(row["units"]),
-                _fmt_dollar(row["royalty"]),
-            )
+        rows = zip(
+            title_format_breakdown["title"],
+            title_format_breakdown["format"],
+            _fmt_int_series(title_format_breakdown["units"]),
+            _fmt_dollar_series(title_format_breakdown["royalty"]),
+        )
+        for cells in rows:
+            table.add_row(*cells)
 
-        console.print(table)
+        _print(table)
     elif not title_totals.empty:
         table = Table(title="KDP Sales by Title", show_lines=True)
         table.add_column("Title", style="bold")
         table.add_column("Units", justify="right")
         table.add_column("Royalty", justify="right")
 
-        for _, row in title_totals.iterrows():
-            table.add_row(
-                row["title"],
-                _fmt_int(row["units"]),
-                _fmt_dollar(row["royalty"]),
-            )
+        rows = zip(
+            title_totals["title"],
+            _fmt_int_series(title_totals["units"]),
+            _fmt_dollar_series(title_totals["royalty"]),
+        )
+        for cells in rows:
+            table.add_row(*cells)
 
-        console.print(table)
+        _print(table)
 
     # Paired purchases
     if paired:
         paired_text = "[bold]Same-day Book 1 + Book 2 purchases (likely ad-driven):[/bold]\n"
         for p in paired:
             paired_text += f"  {p['date']}: {p['details']}\n"
-        console.print(Panel(paired_text.rstrip(), title="Paired Purchases Detected"))
+        _print(Panel(paired_text.rstrip(), title="Paired Purchases Detected"))
 
     # Attribution gap panel
     gap_text = (
@@ -320,7 +363,7 @@ def render_kdp_reconciliation(result: dict) -> None:
     note = gap.get("note", "")
     if note:
         gap_text += f"\n\n[dim]{note}[/dim]"
-    console.print(Panel(gap_text, title="Attribution Gap"))
+    _print(Panel(gap_text, title="Attribution Gap"))
 
     # Ad-influenced analysis
     if ad_influenced:
@@ -353,9 +396,9 @@ def render_kdp_reconciliation(result: dict) -> None:
         if inf_note:
             inf_text += f"\n[dim]{inf_note}[/dim]"
 
-        console.print(Panel(inf_text.rstrip(), title="Ad-Influenced Analysis"))
+        _print(Panel(inf_text.rstrip(), title="Ad-Influenced Analysis"))
 
-    console.print()
+    _print()
 
 
 def render_bid_recommendations(result: dict) -> None:
@@ -364,7 +407,7 @@ def render_bid_recommendations(result: dict) -> None:
     flags = result["flags"]
 
     if df.empty:
-        console.print("[dim]No bid recommendation data.[/dim]")
+        _print("[dim]No bid recommendation data.[/dim]")
         return
 
     table = Table(title="Bid Recommendations", show_lines=True)
@@ -378,38 +421,30 @@ def render_bid_recommendations(result: dict) -> None:
     table.add_column("Max Bid", justify="right")
     table.add_column("Flag")
 
-    flag_map = {}
-    for f in flags:
-        flag_map.setdefault(f["target"], []).append(f)
-
-    for _, row in df.iterrows():
-        target = row["targeting"]
-        target_flags = flag_map.get(target, [])
-        flag_text = Text()
-        for f in target_flags:
-            color = "red" if f["severity"] == "warning" else "yellow"
-            flag_text.append(f"[{f['type']}] ", style=color)
-
-        table.add_row(
-            target,
-            row.get("campaign_name", ""),
-            _fmt_int(row["clicks"]),
-            _fmt_int(row["orders"]),
-            _fmt_pct(row.get("conversion_rate")),
-            _fmt_dollar(row.get("current_bid")),
-            _fmt_dollar(row.get("suggested_bid")),
-            _fmt_dollar(row.get("max_profitable_bid")),
-            flag_text,
-        )
+    flag_texts = _flag_texts(flags, separator=" ")
+
+    rows = zip(
+        df["targeting"],
+        _column(df, "campaign_name", ""),
+        _fmt_int_series(df["clicks"]),
+        _fmt_int_series(df["orders"]),
+        _fmt_pct_series(_column(df, "conversion_rate")),
+        _fmt_dollar_series(_column(df, "current_bid")),
+        _fmt_dollar_series(_column(df, "suggested_bid")),
+        _fmt_dollar_series(_column(df, "max_profitable_bid")),
+    )
+    for target, *cells in rows:
+        flag_text = flag_texts[target] if target in flag_texts else Text()
+        table.add_row(target, *cells, flag_text)
 
-    console.print(table)
-    console.print()
+    _print(table)
+    _print()
 
 
 def render_action_items(all_flags: list) -> None:
     """Render consolidated action items panel."""
     if not all_flags:
-        console.print(Panel("[green]No action items — all targets performing within thresholds.[/green]"))
+        _print(Panel("[green]No action items — all targets performing within thresholds.[/green]"))
         return
 
     warnings = [f for f in all_flags if f.get("severity") == "warning"]
@@ -426,7 +461,7 @@ def render_action_items(all_flags: list) -> None:
         for f in infos:
             text_parts.append(f"  - {f['message']}")
 
-    console.print(Panel("\n".join(text_parts), title="Action Items"))
+    _print(Panel("\n".join(text_parts), title="Action Items"))
 
 
 def render_full_report(
@@ -440,26 +475,31 @@ def render_full_report(
     week_start: str = "",
     week_end: str = "",
 ) -> None:
-    """Render the complete weekly report to terminal."""
-    console.print()
-    title = f"[bold]Weekly Ad Report — Week of {week}[/bold]"
-    if week_start and week_end:
-        title += f"\n[dim]Report period: {week_start} to {week_end}[/dim]"
-    console.print(Panel(title, style="blue"))
-    console.print()
-
-    render_campaign_summary(campaign_summary)
-    render_asin_performance(asin_performance)
-    render_keyword_performance(keyword_performance)
-    render_search_term_analysis(search_term_analysis)
-    render_kdp_reconciliation(kdp_reconciliation)
-    render_bid_recommendations(bid_recommendations)
-
-    # Collect all flags for action items
-    all_flags = (
-        asin_performance.get("flags", [])
-        + keyword_performance.get("flags", [])
-        + search_term_analysis.get("drift_flags", [])
-        + bid_recommendations.get("flags", [])
-    )
-    render_action_items(all_flags)
+    """Render the complete weekly report to terminal.
+
+    The console buffers everything printed inside the with block and writes
+    it to the terminal in one go when the block exits.
+    """
+    with console:
+        _print()
+        title = f"[bold]Weekly Ad Report — Week of {week}[/bold]"
+        if week_start and week_end:
+            title += f"\n[dim]Report period: {week_start} to {week_end}[/dim]"
+        _print(Panel(title, style="blue"))
+        _print()
+
+        render_campaign_summary(campaign_summary)
+        render_asin_performance(asin_performance)
+        render_keyword_performance(keyword_performance)
+        render_search_term_analysis(search_term_analysis)
+        render_kdp_reconciliation(kdp_reconciliation)
+        render_bid_recommendations(bid_recommendations)
+
+        # Collect all flags for action items
+        all_flags = (
+            asin_performance.get("flags", [])
+            + keyword_performance.get("flags", [])
+            + search_term_analysis.get("drift_flags", [])
+            + bid_recommendations.get("flags", [])
+        )
+        render_action_items(all_flags)
@@ -1,5 +1,7 @@
 """SQLite database schema and connection management."""
 
+import atexit
+import itertools
 import os
 import sqlite3
 
@@ -110,8 +112,50 @@ CREATE TABLE IF NOT EXISTS targeting_report_lifetime (
     suggested_bid_high REAL,
     UNIQUE(snapshot_id, targeting, match_type)
 );
+
+-- The UNIQUE constraints above already index snapshot_id for the other
+-- child tables; these two have none, and a snapshot replace deletes by it
+CREATE INDEX IF NOT EXISTS idx_search_term_metrics_snapshot
+    ON search_term_metrics(snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_bid_recommendations_snapshot
+    ON bid_recommendations(snapshot_id);
+
+-- Cumulative KDP query: filters on date and groups by date/title/format
+CREATE INDEX IF NOT EXISTS idx_kdp_daily_sales_date
+    ON kdp_daily_sales(date, title, format);
+
+-- Per-snapshot campaign totals, written by save_weekly_snapshot so lifetime
+-- figures sum one row per week instead of every campaign_metrics row
+CREATE TABLE IF NOT EXISTS snapshot_aggregates (
+    snapshot_id INTEGER PRIMARY KEY REFERENCES weekly_snapshots(id) ON DELETE CASCADE,
+    total_spend REAL,
+    total_sales REAL,
+    total_orders INTEGER
+);
+
+-- Backfill snapshots saved before snapshot_aggregates existed
+INSERT OR IGNORE INTO snapshot_aggregates
+    SELECT snapshot_id, SUM(spend), SUM(sales), SUM(orders)
+    FROM campaign_metrics GROUP BY snapshot_id;
+
+-- Cascade a snapshot delete to its child rows. A trigger rather than
+-- ON DELETE CASCADE, which existing tables can't gain without a rebuild.
+CREATE TRIGGER IF NOT EXISTS trg_weekly_snapshots_delete
+BEFORE DELETE ON weekly_snapshots
+BEGIN
+    DELETE FROM campaign_metrics WHERE snapshot_id = OLD.id;
+    DELETE FROM target_metrics WHERE snapshot_id = OLD.id;
+    DELETE FROM search_term_metrics WHERE snapshot_id = OLD.id;
+    DELETE FROM kdp_daily_sales WHERE snapshot_id = OLD.id;
+    DELETE FROM bid_recommendations WHERE snapshot_id = OLD.id;
+    DELETE FROM targeting_report_lifetime WHERE snapshot_id = OLD.id;
+END;
 """
 
+# Stored in PRAGMA user_version once SCHEMA and _MIGRATIONS have been applied.
+# Bump it whenever either changes so existing databases pick the change up.
+SCHEMA_VERSION = 4
+
 # Migration queries for existing databases that lack new columns.
 # Each is (table, column, type). Failures are silently ignored (column already exists).
 _MIGRATIONS = [
@@ -134,20 +178,82 @@ def _run_migrations(conn: sqlite3.Connection) -> None:
                 raise
 
 
+# One shared connection per database path for the life of the process
+_CONN_CACHE = {}
+
+
+def close_connections() -> None:
+    """Close every cached connection (registered to run at exit).
+
+    Runs PRAGMA optimize first so SQLite refreshes planner statistics for
+    the tables this process queried.
+    """
+    while _CONN_CACHE:
+        _, conn = _CONN_CACHE.popitem()
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass  # Busy, locked or already closed: statistics are only a hint
+        finally:
+            conn.close()
+
+
+atexit.register(close_connections)
+
+
+def bulk_insert(conn: sqlite3.Connection, sql: str, rows, batch_size: int = 10_000) -> int:
+    """Insert rows from any iterable with executemany, batch_size at a time.
+
+    Rows are pulled lazily, so a generator of parameter tuples is never
+    materialized in full. Runs inside the caller's transaction and does not
+    commit, so a multi-table save stays atomic.
+
+    Returns the number of rows inserted.
+    """
+    rows = iter(rows)
+    total = 0
+    while True:
+        chunk = list(itertools.islice(rows, batch_size))
+        if not chunk:
+            return total
+        conn.executemany(sql, chunk)
+        total += len(chunk)
+
+
 def get_connection(db_path: str = None) -> sqlite3.Connection:
-    """Get a SQLite connection, creating the database and schema if needed."""
+    """Get a SQLite connection, creating the database and schema if needed.
+
+    Connections are cached per path and shared by every caller, so callers
+    must not close them; close_connections() does that at exit.
+    """
     if db_path is None:
-        db_path = os.path.normpath(DEFAULT_DB_PATH)
+        db_path = DEFAULT_DB_PATH
+    # One cache key per file, however the path was spelled
+    db_path = os.path.abspath(os.path.normpath(db_path))
+    if db_path in _CONN_CACHE:
+        return _CONN_CACHE[db_path]
 
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    # WAL + synchronous=NORMAL fsyncs at checkpoints rather than on every
+    # commit; the rest keep temp tables and hot pages in memory
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA cache_size = -65536")
     conn.execute("PRAGMA foreign_keys = ON")
 
-    # Create tables if they don't exist
-    conn.executescript(SCHEMA)
-    _run_migrations(conn)
-    conn.commit()
+    # Create tables if they don't exist. Databases already at the current
+    # schema version skip the script (and its write transaction) entirely.
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        conn.executescript(SCHEMA)
+        _run_migrations(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
 
+    _CONN_CACHE[db_path] = conn
     return conn
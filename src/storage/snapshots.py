@@ -1,11 +1,55 @@
 """Weekly snapshot save/retrieve operations."""
 
+import itertools
 from datetime import datetime, timedelta
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
-from src.storage.database import get_connection
+from src.storage.database import bulk_insert, get_connection
+
+# Statement text is kept constant so the driver's statement cache reuses
+# the prepared INSERTs on every save instead of reparsing them
+_SNAPSHOT_INSERT = """INSERT INTO weekly_snapshots (week_start, week_end, imported_at, notes)
+   VALUES (?, ?, ?, ?)"""
+
+_CAMPAIGN_METRICS_INSERT = """INSERT OR REPLACE INTO campaign_metrics
+   (snapshot_id, campaign_name, impressions, clicks, spend,
+    sales, orders, ctr, avg_cpc, acos, roas)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_SNAPSHOT_AGGREGATES_INSERT = """INSERT OR REPLACE INTO snapshot_aggregates
+   SELECT snapshot_id, SUM(spend), SUM(sales), SUM(orders)
+   FROM campaign_metrics WHERE snapshot_id = ? GROUP BY snapshot_id"""
+
+_TARGET_METRICS_INSERT = """INSERT OR REPLACE INTO target_metrics
+   (snapshot_id, campaign_name, targeting, target_type, match_type,
+    bid, suggested_bid_low, suggested_bid_median, suggested_bid_high,
+    impressions, clicks, spend, sales, orders, ctr, cpc,
+    conversion_rate)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_SEARCH_TERM_METRICS_INSERT = """INSERT INTO search_term_metrics
+   (snapshot_id, campaign_name, targeting, search_term, match_type,
+    impressions, clicks, spend, sales, orders, is_drift)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_KDP_DAILY_SALES_INSERT = """INSERT OR REPLACE INTO kdp_daily_sales
+   (snapshot_id, date, title, format, units_sold, net_units_sold, royalty)
+   VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+_BID_RECOMMENDATIONS_INSERT = """INSERT INTO bid_recommendations
+   (snapshot_id, targeting, current_bid, suggested_bid,
+    recommended_max_bid, conversion_rate, flag)
+   VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+_TARGETING_LIFETIME_INSERT = """INSERT OR REPLACE INTO targeting_report_lifetime
+   (snapshot_id, targeting, match_type, state,
+    impressions, clicks, spend, orders, sales,
+    bid, suggested_bid_low, suggested_bid_median,
+    suggested_bid_high)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
 
 
 def save_weekly_snapshot(
@@ -27,6 +71,9 @@ def save_weekly_snapshot(
     """
     conn = get_connection(db_path)
     cursor = conn.cursor()
+    # Take the write lock up front so the deletes and every insert land as
+    # one transaction; commit()/rollback() below end it
+    cursor.execute("BEGIN IMMEDIATE")
 
     try:
         # Check for existing snapshot for this week and clean it up first
@@ -36,99 +83,19 @@ def save_weekly_snapshot(
         ).fetchone()
 
         if existing:
-            old_id = existing[0]
-            # Delete child records before replacing the snapshot
-            for child_table in [
-                "campaign_metrics",
-                "target_metrics",
-                "search_term_metrics",
-                "kdp_daily_sales",
-                "bid_recommendations",
-                "targeting_report_lifetime",
-            ]:
-                cursor.execute(
-                    f"DELETE FROM {child_table} WHERE snapshot_id = ?",
-                    (old_id,),
-                )
+            # The schema's delete trigger removes the child records with it
             cursor.execute(
                 "DELETE FROM weekly_snapshots WHERE id = ?",
-                (old_id,),
+                (existing[0],),
             )
 
         # Insert snapshot record
         cursor.execute(
-            """INSERT INTO weekly_snapshots (week_start, week_end, imported_at, notes)
-               VALUES (?, ?, ?, ?)""",
+            _SNAPSHOT_INSERT,
             (week_start, week_end, datetime.now().isoformat(), notes),
         )
         snapshot_id = cursor.lastrowid
 
-        # Save campaign metrics
-        summary_table = campaign_summary.get("table", pd.DataFrame())
-        for _, row in summary_table.iterrows():
-            cursor.execute(
-                """INSERT OR REPLACE INTO campaign_metrics
-                   (snapshot_id, campaign_name, impressions, clicks, spend,
-                    sales, orders, ctr, avg_cpc, acos, roas)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    snapshot_id,
-                    row["campaign_name"],
-                    int(row.get("impressions", 0)),
-                    int(row.get("clicks", 0)),
-                    float(row.get("spend", 0)),
-                    float(row.get("sales", 0)),
-                    int(row.get("orders", 0)),
-                    float(row.get("ctr", 0)),
-                    float(row.get("avg_cpc", 0)),
-                    float(row["acos"]) if pd.notna(row.get("acos")) else None,
-                    float(row["roas"]) if pd.notna(row.get("roas")) else None,
-                ),
-            )
-
-        # Save target metrics
-        for _, row in targeting_df.iterrows():
-            # Determine target type
-            targeting_val = str(row.get("targeting", ""))
-            is_asin = (
-                len(targeting_val) == 10
-                and (targeting_val[0].isdigit() or targeting_val.startswith("B0"))
-            )
-            target_type = "asin" if is_asin else "keyword"
-
-            conv_rate = 0
-            if row.get("clicks", 0) > 0:
-                conv_rate = row.get("orders", 0) / row["clicks"]
-
-            cursor.execute(
-                """INSERT OR REPLACE INTO target_metrics
-                   (snapshot_id, campaign_name, targeting, target_type, match_type,
-                    bid, suggested_bid_low, suggested_bid_median, suggested_bid_high,
-                    impressions, clicks, spend, sales, orders, ctr, cpc,
-                    conversion_rate)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    snapshot_id,
-                    row.get("campaign_name", ""),
-                    targeting_val,
-                    target_type,
-                    row.get("match_type", ""),
-                    float(row["bid"]) if pd.notna(row.get("bid")) else None,
-                    float(row["suggested_bid_low"]) if pd.notna(row.get("suggested_bid_low")) else None,
-                    float(row["suggested_bid_median"]) if pd.notna(row.get("suggested_bid_median")) else None,
-                    float(row["suggested_bid_high"]) if pd.notna(row.get("suggested_bid_high")) else None,
-                    int(row.get("impressions", 0)),
-                    int(row.get("clicks", 0)),
-                    float(row.get("spend", 0)),
-                    float(row.get("sales", 0)),
-                    int(row.get("orders", 0)),
-                    float(row.get("ctr", 0)),
-                    float(row.get("cpc", 0)),
-                    float(conv_rate),
-                ),
-            )
-
-        # Save search term metrics
         # Build drift lookup from analysis-layer drift flags
         drift_keys = set()
         for flag in (drift_flags or []):
@@ -138,112 +105,29 @@ def save_weekly_snapshot(
                 flag.get("search_term", ""),
             ))
 
-        for _, row in search_term_df.iterrows():
-            campaign = row.get("campaign_name", "")
-            targeting = row.get("targeting", "")
-            search_term = row.get("search_term", "")
-            is_drift = 1 if (campaign, targeting, search_term) in drift_keys else 0
-
-            cursor.execute(
-                """INSERT INTO search_term_metrics
-                   (snapshot_id, campaign_name, targeting, search_term, match_type,
-                    impressions, clicks, spend, sales, orders, is_drift)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    snapshot_id,
-                    campaign,
-                    targeting,
-                    search_term,
-                    row.get("match_type", ""),
-                    int(row.get("impressions", 0)),
-                    int(row.get("clicks", 0)),
-                    float(row.get("spend", 0)),
-                    float(row.get("sales", 0)),
-                    int(row.get("orders", 0)),
-                    is_drift,
-                ),
-            )
-
-        # Save KDP daily sales — only rows within the snapshot's date window
-        units_col = "net_units_sold" if "net_units_sold" in kdp_df.columns else "units_sold"
-        kdp_filtered = kdp_df.copy()
-        if not kdp_filtered.empty and "date" in kdp_filtered.columns:
-            kdp_filtered = kdp_filtered.dropna(subset=["date"])
-            kdp_filtered["_date_str"] = kdp_filtered["date"].apply(
-                lambda d: d.strftime("%Y-%m-%d") if pd.notna(d) and hasattr(d, "strftime") else str(d)
-            )
-            kdp_filtered = kdp_filtered[
-                (kdp_filtered["_date_str"] >= week_start)
-                & (kdp_filtered["_date_str"] <= week_end)
-            ]
-        for _, row in kdp_filtered.iterrows():
-            date_val = row.get("date")
-            if pd.notna(date_val) and hasattr(date_val, "strftime"):
-                date_val = date_val.strftime("%Y-%m-%d")
-
-            cursor.execute(
-                """INSERT OR REPLACE INTO kdp_daily_sales
-                   (snapshot_id, date, title, format, units_sold, net_units_sold, royalty)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    snapshot_id,
-                    str(date_val),
-                    row.get("title", ""),
-                    row.get("format", ""),
-                    int(row.get("units_sold", 0)),
-                    int(row.get(units_col, 0)),
-                    float(row.get("royalty", 0)),
-                ),
-            )
-
-        # Save bid recommendations
+        summary_table = campaign_summary.get("table", pd.DataFrame())
         bid_table = bid_recommendations.get("table", pd.DataFrame())
         bid_flags = bid_recommendations.get("flags", [])
         flag_lookup = {f["target"]: f.get("type", "") for f in bid_flags}
 
-        for _, row in bid_table.iterrows():
-            cursor.execute(
-                """INSERT INTO bid_recommendations
-                   (snapshot_id, targeting, current_bid, suggested_bid,
-                    recommended_max_bid, conversion_rate, flag)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    snapshot_id,
-                    row.get("targeting", ""),
-                    float(row["current_bid"]) if pd.notna(row.get("current_bid")) else None,
-                    float(row["suggested_bid"]) if pd.notna(row.get("suggested_bid")) else None,
-                    float(row["max_profitable_bid"]) if pd.notna(row.get("max_profitable_bid")) else None,
-                    float(row.get("conversion_rate", 0)),
-                    flag_lookup.get(row.get("targeting", ""), None),
-                ),
-            )
-
-        # Save targeting report lifetime data (for weekly delta computation)
+        bulk_insert(conn, _CAMPAIGN_METRICS_INSERT,
+                    _campaign_metric_rows(snapshot_id, summary_table))
+        bulk_insert(conn, _TARGET_METRICS_INSERT,
+                    _target_metric_rows(snapshot_id, targeting_df))
+        bulk_insert(conn, _SEARCH_TERM_METRICS_INSERT,
+                    _search_term_rows(snapshot_id, search_term_df, drift_keys))
+        # Only KDP rows within the snapshot's date window
+        bulk_insert(conn, _KDP_DAILY_SALES_INSERT,
+                    _kdp_sales_rows(snapshot_id, kdp_df, week_start, week_end))
+        bulk_insert(conn, _BID_RECOMMENDATIONS_INSERT,
+                    _bid_recommendation_rows(snapshot_id, bid_table, flag_lookup))
+        # Targeting report lifetime data (for weekly delta computation)
         if targeting_report_df is not None and not targeting_report_df.empty:
-            for _, row in targeting_report_df.iterrows():
-                cursor.execute(
-                    """INSERT OR REPLACE INTO targeting_report_lifetime
-                       (snapshot_id, targeting, match_type, state,
-                        impressions, clicks, spend, orders, sales,
-                        bid, suggested_bid_low, suggested_bid_median,
-                        suggested_bid_high)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        snapshot_id,
-                        row.get("targeting", ""),
-                        row.get("match_type", ""),
-                        row.get("state", ""),
-                        int(row.get("impressions", 0)),
-                        int(row.get("clicks", 0)),
-                        float(row.get("spend", 0)),
-                        int(row.get("orders", 0)),
-                        float(row.get("sales", 0)),
-                        float(row["bid"]) if pd.notna(row.get("bid")) else None,
-                        float(row["suggested_bid_low"]) if pd.notna(row.get("suggested_bid_low")) else None,
-                        float(row["suggested_bid_median"]) if pd.notna(row.get("suggested_bid_median")) else None,
-                        float(row["suggested_bid_high"]) if pd.notna(row.get("suggested_bid_high")) else None,
-                    ),
-                )
+            bulk_insert(conn, _TARGETING_LIFETIME_INSERT,
+                        _targeting_lifetime_rows(snapshot_id, targeting_report_df))
+
+        # Lifetime totals read this one row instead of rescanning campaign_metrics
+        cursor.execute(_SNAPSHOT_AGGREGATES_INSERT, (snapshot_id,))
 
         conn.commit()
         return snapshot_id
@@ -251,8 +135,197 @@ def save_weekly_snapshot(
     except Exception:
         conn.rollback()
         raise
-    finally:
-        conn.close()
+
+
+def _values(df: pd.DataFrame, col: str, default=None) -> list:
+    """Column values as Python objects, or default for every row if absent."""
+    if col in df.columns:
+        return df[col].tolist()
+    return [default] * len(df)
+
+
+def _int_values(df: pd.DataFrame, col: str) -> list:
+    if col in df.columns:
+        return df[col].astype("int64").tolist()
+    return [0] * len(df)
+
+
+def _float_values(df: pd.DataFrame, col: str) -> list:
+    if col in df.columns:
+        return df[col].astype("float64").tolist()
+    return [0.0] * len(df)
+
+
+def _nullable_float_values(df: pd.DataFrame, col: str) -> list:
+    """Float values with missing entries as None, so they bind as NULL."""
+    if col not in df.columns:
+        return [None] * len(df)
+    values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+def _campaign_metric_rows(snapshot_id: int, summary_table: pd.DataFrame):
+    """Return campaign_metrics parameter tuples, one per row."""
+    return zip(
+        itertools.repeat(snapshot_id),
+        summary_table["campaign_name"].tolist(),
+        _int_values(summary_table, "impressions"),
+        _int_values(summary_table, "clicks"),
+        _float_values(summary_table, "spend"),
+        _float_values(summary_table, "sales"),
+        _int_values(summary_table, "orders"),
+        _float_values(summary_table, "ctr"),
+        _float_values(summary_table, "avg_cpc"),
+        _nullable_float_values(summary_table, "acos"),
+        _nullable_float_values(summary_table, "roas"),
+    )
+
+
+def _target_metric_rows(snapshot_id: int, targeting_df: pd.DataFrame):
+    """Return target_metrics parameter tuples, one per row."""
+    targeting = pd.Series([str(v) for v in _values(targeting_df, "targeting", "")], dtype=object)
+    # Determine target type: 10-character ASIN/ISBN vs keyword
+    is_asin = (targeting.str.len() == 10) & (
+        targeting.str[:1].str.isdigit() | targeting.str.startswith("B0")
+    )
+    target_type = np.where(is_asin, "asin", "keyword")
+
+    clicks = np.asarray(_float_values(targeting_df, "clicks"))
+    orders = np.asarray(_float_values(targeting_df, "orders"))
+    conv_rate = np.divide(orders, clicks, out=np.zeros_like(clicks), where=clicks > 0)
+
+    return zip(
+        itertools.repeat(snapshot_id),
+        _values(targeting_df, "campaign_name", ""),
+        targeting.tolist(),
+        target_type.tolist(),
+        _values(targeting_df, "match_type", ""),
+        _nullable_float_values(targeting_df, "bid"),
+        _nullable_float_values(targeting_df, "suggested_bid_low"),
+        _nullable_float_values(targeting_df, "suggested_bid_median"),
+        _nullable_float_values(targeting_df, "suggested_bid_high"),
+        _int_values(targeting_df, "impressions"),
+        _int_values(targeting_df, "clicks"),
+        _float_values(targeting_df, "spend"),
+        _float_values(targeting_df, "sales"),
+        _int_values(targeting_df, "orders"),
+        _float_values(targeting_df, "ctr"),
+        _float_values(targeting_df, "cpc"),
+        conv_rate.tolist(),
+    )
+
+
+def _search_term_rows(snapshot_id: int, search_term_df: pd.DataFrame, drift_keys: set):
+    """Return search_term_metrics parameter tuples, one per row, marking drift rows."""
+    campaigns = _values(search_term_df, "campaign_name", "")
+    targetings = _values(search_term_df, "targeting", "")
+    search_terms = _values(search_term_df, "search_term", "")
+    is_drift = [
+        1 if key in drift_keys else 0
+        for key in zip(campaigns, targetings, search_terms)
+    ]
+
+    return zip(
+        itertools.repeat(snapshot_id),
+        campaigns,
+        targetings,
+        search_terms,
+        _values(search_term_df, "match_type", ""),
+        _int_values(search_term_df, "impressions"),
+        _int_values(search_term_df, "clicks"),
+        _float_values(search_term_df, "spend"),
+        _float_values(search_term_df, "sales"),
+        _int_values(search_term_df, "orders"),
+        is_drift,
+    )
+
+
+def _date_strings(dates: pd.Series) -> pd.Series:
+    """Format dates as YYYY-MM-DD, vectorized for datetime64 columns."""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.strftime("%Y-%m-%d")
+    return dates.map(
+        lambda d: d.strftime("%Y-%m-%d") if pd.notna(d) and hasattr(d, "strftime") else str(d)
+    )
+
+
+def _kdp_sales_rows(snapshot_id: int, kdp_df: pd.DataFrame, week_start: str, week_end: str):
+    """Return kdp_daily_sales parameter tuples for rows dated within the week."""
+    units_col = "net_units_sold" if "net_units_sold" in kdp_df.columns else "units_sold"
+    kdp_filtered = kdp_df
+    if kdp_filtered.empty or "date" not in kdp_filtered.columns:
+        dates = [str(d) for d in _values(kdp_filtered, "date")]
+    else:
+        # Format the present dates once; the strings serve both the window
+        # filter and the insert, and the frame is sliced a single time
+        present = kdp_df["date"].notna().to_numpy()
+        date_str = _date_strings(kdp_df["date"][present])
+        in_window = ((date_str >= week_start) & (date_str <= week_end)).to_numpy()
+        keep = present.copy()
+        keep[present] = in_window
+        kdp_filtered = kdp_df[keep]
+        dates = date_str[in_window].tolist()
+
+    return zip(
+        itertools.repeat(snapshot_id),
+        dates,
+        _values(kdp_filtered, "title", ""),
+        _values(kdp_filtered, "format", ""),
+        _int_values(kdp_filtered, "units_sold"),
+        _int_values(kdp_filtered, units_col),
+        _float_values(kdp_filtered, "royalty"),
+    )
+
+
+def _bid_recommendation_rows(snapshot_id: int, bid_table: pd.DataFrame, flag_lookup: dict):
+    """Return bid_recommendations parameter tuples, one per row."""
+    targeting = pd.Series(_values(bid_table, "targeting", ""), dtype=object)
+    # One hash-map pass over the column; unflagged targets bind as NULL
+    flags = targeting.map(flag_lookup)
+
+    return zip(
+        itertools.repeat(snapshot_id),
+        targeting.tolist(),
+        _nullable_float_values(bid_table, "current_bid"),
+        _nullable_float_values(bid_table, "suggested_bid"),
+        _nullable_float_values(bid_table, "max_profitable_bid"),
+        _float_values(bid_table, "conversion_rate"),
+        flags.astype(object).where(flags.notna(), None).tolist(),
+    )
+
+
+def _targeting_lifetime_rows(snapshot_id: int, targeting_report_df: pd.DataFrame):
+    """Return targeting_report_lifetime parameter tuples, one per row."""
+    return zip(
+        itertools.repeat(snapshot_id),
+        _values(targeting_report_df, "targeting", ""),
+        _values(targeting_report_df, "match_type", ""),
+        _values(targeting_report_df, "state", ""),
+        _int_values(targeting_report_df, "impressions"),
+        _int_values(targeting_report_df, "clicks"),
+        _float_values(targeting_report_df, "spend"),
+        _int_values(targeting_report_df, "orders"),
+        _float_values(targeting_report_df, "sales"),
+        _nullable_float_values(targeting_report_df, "bid"),
+        _nullable_float_values(targeting_report_df, "suggested_bid_low"),
+        _nullable_float_values(targeting_report_df, "suggested_bid_median"),
+        _nullable_float_values(targeting_report_df, "suggested_bid_high"),
+    )
+
+
+def _read_frame(conn, sql: str, params=()) -> pd.DataFrame:
+    """Run a query and build a DataFrame straight from the fetched tuples.
+
+    Skips read_sql_query's generic path; column dtypes are inferred the
+    same way.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples rather than sqlite3.Row
+    cursor.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
 
 
 def _get_prior_snapshot_id(conn, current_week: str) -> Optional[int]:
@@ -272,23 +345,19 @@ def get_prior_week_summary(
     """Retrieve the prior week's campaign summary for WoW comparison."""
     conn = get_connection(db_path)
 
-    try:
-        snapshot_id = _get_prior_snapshot_id(conn, current_week)
-        if snapshot_id is None:
-            return None
-
-        df = pd.read_sql_query(
-            """SELECT campaign_name, impressions, clicks, spend, sales,
-                      orders, ctr, avg_cpc, acos, roas
-               FROM campaign_metrics WHERE snapshot_id = ?""",
-            conn,
-            params=(snapshot_id,),
-        )
+    snapshot_id = _get_prior_snapshot_id(conn, current_week)
+    if snapshot_id is None:
+        return None
 
-        return df if not df.empty else None
+    df = _read_frame(
+        conn,
+        """SELECT campaign_name, impressions, clicks, spend, sales,
+                  orders, ctr, avg_cpc, acos, roas
+           FROM campaign_metrics WHERE snapshot_id = ?""",
+        (snapshot_id,),
+    )
 
-    finally:
-        conn.close()
+    return df if not df.empty else None
 
 
 def get_prior_targeting_lifetime(
@@ -302,24 +371,20 @@ def get_prior_targeting_lifetime(
     """
     conn = get_connection(db_path)
 
-    try:
-        snapshot_id = _get_prior_snapshot_id(conn, current_week)
-        if snapshot_id is None:
-            return None
-
-        df = pd.read_sql_query(
-            """SELECT targeting, match_type, state, impressions, clicks,
-                      spend, orders, sales, bid,
-                      suggested_bid_low, suggested_bid_median, suggested_bid_high
-               FROM targeting_report_lifetime WHERE snapshot_id = ?""",
-            conn,
-            params=(snapshot_id,),
-        )
+    snapshot_id = _get_prior_snapshot_id(conn, current_week)
+    if snapshot_id is None:
+        return None
 
-        return df if not df.empty else None
+    df = _read_frame(
+        conn,
+        """SELECT targeting, match_type, state, impressions, clicks,
+                  spend, orders, sales, bid,
+                  suggested_bid_low, suggested_bid_median, suggested_bid_high
+           FROM targeting_report_lifetime WHERE snapshot_id = ?""",
+        (snapshot_id,),
+    )
 
-    finally:
-        conn.close()
+    return df if not df.empty else None
 
 
 def get_cumulative_kdp_data(
@@ -341,34 +406,30 @@ def get_cumulative_kdp_data(
     """
     conn = get_connection(db_path)
 
-    try:
-        where = ""
-        params = []
-        if ads_start_date:
-            where = "WHERE k.date >= ?"
-            params.append(ads_start_date)
-
-        df = pd.read_sql_query(
-            f"""SELECT k.date, k.title, k.format,
-                       MAX(k.units_sold) as units_sold,
-                       MAX(k.net_units_sold) as net_units_sold,
-                       MAX(k.royalty) as royalty
-                FROM kdp_daily_sales k
-                {where}
-                GROUP BY k.date, k.title, k.format
-                ORDER BY k.date""",
-            conn,
-            params=params,
-        )
+    where = ""
+    params = []
+    if ads_start_date:
+        where = "WHERE k.date >= ?"
+        params.append(ads_start_date)
 
-        if df.empty:
-            return None
+    df = _read_frame(
+        conn,
+        f"""SELECT k.date, k.title, k.format,
+                   MAX(k.units_sold) as units_sold,
+                   MAX(k.net_units_sold) as net_units_sold,
+                   MAX(k.royalty) as royalty
+            FROM kdp_daily_sales k
+            {where}
+            GROUP BY k.date, k.title, k.format
+            ORDER BY k.date""",
+        params,
+    )
 
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        return df
+    if df.empty:
+        return None
 
-    finally:
-        conn.close()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    return df
 
 
 def get_cumulative_ad_spend(
@@ -383,24 +444,20 @@ def get_cumulative_ad_spend(
     """
     conn = get_connection(db_path)
 
-    try:
-        if current_week_start:
-            row = conn.execute(
-                """SELECT COALESCE(SUM(cm.spend), 0) as total_spend
-                   FROM campaign_metrics cm
-                   JOIN weekly_snapshots ws ON cm.snapshot_id = ws.id
-                   WHERE ws.week_start < ?""",
-                (current_week_start,),
-            ).fetchone()
-        else:
-            row = conn.execute(
-                "SELECT COALESCE(SUM(spend), 0) as total_spend FROM campaign_metrics"
-            ).fetchone()
-
-        return float(row["total_spend"])
+    if current_week_start:
+        row = conn.execute(
+            """SELECT COALESCE(SUM(cm.spend), 0) as total_spend
+               FROM campaign_metrics cm
+               JOIN weekly_snapshots ws ON cm.snapshot_id = ws.id
+               WHERE ws.week_start < ?""",
+            (current_week_start,),
+        ).fetchone()
+    else:
+        row = conn.execute(
+            "SELECT COALESCE(SUM(spend), 0) as total_spend FROM campaign_metrics"
+        ).fetchone()
 
-    finally:
-        conn.close()
+    return float(row["total_spend"])
 
 
 def get_trend_data(
@@ -422,80 +479,91 @@ def get_trend_data(
 
     conn = get_connection(db_path)
 
-    try:
-        # Use a subquery to get the N most recent weeks, then fetch all
-        # campaign rows for those weeks (avoids hardcoded campaign count)
-        query = """
-            SELECT ws.week_start, cm.campaign_name, cm.{metric}
+    # Use a subquery to get the N most recent weeks, then fetch all
+    # campaign rows for those weeks (avoids hardcoded campaign count)
+    where = """
+        WHERE ws.week_start IN (
+            SELECT DISTINCT week_start FROM weekly_snapshots
+            ORDER BY week_start DESC LIMIT ?
+        )
+    """
+    params = [weeks]
+    if campaign:
+        where += "AND cm.campaign_name = ?"
+        params.append(campaign)
+
+    campaigns = [
+        row[0]
+        for row in conn.execute(
+            f"""SELECT DISTINCT cm.campaign_name
+                FROM campaign_metrics cm
+                JOIN weekly_snapshots ws ON cm.snapshot_id = ws.id
+                {where}
+                ORDER BY cm.campaign_name""",
+            params,
+        )
+    ]
+    if not campaigns:
+        return pd.DataFrame()
+
+    # Pivot in SQL: one row per week, one conditional aggregate per campaign.
+    # Campaign names are bound as parameters; only the whitelisted metric is
+    # formatted into the statement.
+    pivot_columns = ",\n".join(
+        f"MAX(CASE WHEN cm.campaign_name = ? THEN cm.{metric} END)" for _ in campaigns
+    )
+    pivoted = _read_frame(
+        conn,
+        f"""SELECT ws.week_start,
+                   {pivot_columns}
             FROM campaign_metrics cm
             JOIN weekly_snapshots ws ON cm.snapshot_id = ws.id
-            WHERE ws.week_start IN (
-                SELECT DISTINCT week_start FROM weekly_snapshots
-                ORDER BY week_start DESC LIMIT ?
-            )
-            {extra_where}
-            ORDER BY ws.week_start DESC
-        """
-
-        extra_where = ""
-        params = [weeks]
-        if campaign:
-            extra_where = "AND cm.campaign_name = ?"
-            params.append(campaign)
-
-        formatted_query = query.format(metric=metric, extra_where=extra_where)
-
-        df = pd.read_sql_query(formatted_query, conn, params=params)
-
-        if df.empty:
-            return pd.DataFrame()
-
-        # Pivot: weeks as rows, campaigns as columns
-        pivoted = df.pivot_table(
-            index="week_start",
-            columns="campaign_name",
-            values=metric,
-            aggfunc="first",
-        ).reset_index()
-
-        return pivoted.sort_values("week_start")
-
-    finally:
-        conn.close()
+            {where}
+            GROUP BY ws.week_start
+            ORDER BY ws.week_start""",
+        campaigns + params,
+    )
+    pivoted.columns = pd.Index(["week_start", *campaigns], name="campaign_name")
+
+    # Same shape pivot_table gave: campaigns and weeks with no value dropped,
+    # and every campaign column float once any cell is missing
+    pivoted = pivoted.dropna(axis=1, how="all")
+    campaign_cols = pivoted.columns[1:]
+    pivoted = pivoted.dropna(subset=campaign_cols, how="all").reset_index(drop=True)
+    if pivoted[campaign_cols].isna().to_numpy().any():
+        pivoted = pivoted.astype(dict.fromkeys(campaign_cols, "float64"))
+    return pivoted
 
 
 def get_lifetime_summary(db_path: str = None) -> Optional[dict]:
     """Get lifetime aggregate metrics across all snapshots."""
     conn = get_connection(db_path)
 
-    try:
-        row = conn.execute(
-            """SELECT
-                COUNT(DISTINCT ws.id) as weeks_tracked,
-                SUM(cm.spend) as total_spend,
-                SUM(cm.orders) as total_orders,
-                SUM(cm.sales) as total_sales
-               FROM campaign_metrics cm
-               JOIN weekly_snapshots ws ON cm.snapshot_id = ws.id"""
-        ).fetchone()
+    # One row per snapshot that has campaign metrics
+    row = conn.execute(
+        """SELECT
+            COUNT(*) as weeks_tracked,
+            SUM(total_spend) as total_spend,
+            SUM(total_orders) as total_orders,
+            SUM(total_sales) as total_sales
+           FROM snapshot_aggregates"""
+    ).fetchone()
+
+    if not row or row["weeks_tracked"] == 0:
+        return None
+
+    total_spend = row["total_spend"] or 0
+    total_sales = row["total_sales"] or 0
+    total_orders = row["total_orders"] or 0
+    weeks = row["weeks_tracked"]
+
+    return {
+        "weeks_tracked": weeks,
+        "total_spend": total_spend,
+        "total_orders": total_orders,
+        "total_sales": total_sales,
+        "overall_acos": total_spend / total_sales if total_sales > 0 else 0,
+        "overall_roas": total_sales / total_spend if total_spend > 0 else 0,
+        "avg_weekly_spend": total_spend / weeks if weeks > 0 else 0,
+    }
 
-        if not row or row["weeks_tracked"] == 0:
-            return None
-
-        total_spend = row["total_spend"] or 0
-        total_sales = row["total_sales"] or 0
-        total_orders = row["total_orders"] or 0
-        weeks = row["weeks_tracked"]
-
-        return {
-            "weeks_tracked": weeks,
-            "total_spend": total_spend,
-            "total_orders": total_orders,
-            "total_sales": total_sales,
-            "overall_acos": total_spend / total_sales if total_sales > 0 else 0,
-            "overall_roas": total_sales / total_spend if total_spend > 0 else 0,
-            "avg_weekly_spend": total_spend / weeks if weeks > 0 else 0,
-        }
-
-    finally:
-        conn.close()
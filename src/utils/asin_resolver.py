@@ -4,21 +4,44 @@ Resolves raw ASINs (e.g., "b0fkp8tnds", "0063426285") to human-readable
 book titles using a local JSON lookup file and optional Amazon scraping.
 """
 
+import gzip
 import html
+import http.client
 import json
 import os
 import random
 import re
 import signal
 import time
-import urllib.request
-import urllib.error
 import urllib.parse
+import zlib
 
 
 # ASIN pattern: 10-char starting with B0 (Kindle) or 10-digit ISBN
-_ASIN_RE = re.compile(r"^[Bb]0[A-Za-z0-9]{8}$")
-_ISBN_RE = re.compile(r"^\d{10}$")
+# (ASCII-only: a 10-digit ISBN never contains non-ASCII Unicode digits)
+_ASIN_RE = re.compile(r"^[Bb]0[A-Za-z0-9]{8}$", re.ASCII)
+_ISBN_RE = re.compile(r"^\d{10}$", re.ASCII)
+
+# Scraped page patterns; the search result page is scanned with finditer so
+# it stops at the first usable title
+_PRODUCT_TITLE_RE = re.compile(r'id="productTitle"[^>]*>(.*?)</span>', re.DOTALL)
+_TITLE_TAG_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.DOTALL)
+_H3_RE = re.compile(r"<h3[^>]*>(.*?)</h3>", re.DOTALL)
+_HEADING_SNIPPET_RE = re.compile(
+    r'(?:aria-level="3"|role="heading")[^>]*>(.*?)</(?:span|div|h3)', re.DOTALL
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Markers of Amazon's captcha page, looked for in its first few KB
+_BOT_CHECK_MARKERS = ("Robot Check", "/errors/validateCaptcha")
+_BOT_CHECK_HEAD = 4096
+
+# Title cleanup suffixes, applied in order by _clean_title
+_STORE_SUFFIX_RE = re.compile(r"\s*:\s*(Books|Kindle Store)\s*$")
+_ISBN_AMAZON_SUFFIX_RE = re.compile(r":\s*\d{13,}:\s*Amazon\.com\s*$")
+_AMAZON_SUFFIX_RE = re.compile(r"\s*:\s*Amazon\.com\s*$")
+_EBOOK_SUFFIX_RE = re.compile(r"\s*eBook\s*:\s*.+$")
+_AUTHOR_SUFFIX_RE = re.compile(r":\s*[A-Z][a-z]+,\s*[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?\s*$")
 
 _DEFAULT_LOOKUP_PATH = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "asin_lookup.json"
@@ -34,7 +57,17 @@ _USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
 ]
 
-# Delay range between requests (seconds) — randomized jitter
+# Scrape requests reuse one keep-alive connection per (scheme, host), so a
+# batch of ASINs pays DNS + TLS setup once per host instead of per request
+_CONNECTIONS = {}
+_MAX_REDIRECTS = 5
+
+# Failed lookups are remembered in a sidecar next to the lookup file so the
+# same unresolvable ASINs are not re-scraped every week
+_MISSES_FILENAME = "asin_misses.json"
+_MISS_TTL = 30 * 24 * 3600  # seconds before a failed ASIN is scraped again
+
+# Delay range between request starts (seconds) — randomized jitter
 _DELAY_MIN = 2.0
 _DELAY_MAX = 5.0
 
@@ -47,25 +80,84 @@ _TOTAL_BACKOFF_BUDGET = 180.0  # stop retrying after this much total backoff tim
 def is_asin(term: str) -> bool:
     """Check if a search term looks like an ASIN or 10-digit ISBN."""
     term = term.strip()
-    return bool(_ASIN_RE.match(term) or _ISBN_RE.match(term))
+    # Length and first character rule out almost every search term before
+    # either regex runs
+    if len(term) != 10:
+        return False
+    first = term[0]
+    if first in "Bb":
+        return _ASIN_RE.match(term) is not None
+    if first.isdigit():
+        return _ISBN_RE.match(term) is not None
+    return False
+
+
+def _replace_file(path: str, data: bytes) -> None:
+    """Write data to a temp file beside path, then os.replace it into place.
+
+    Readers see either the old file or the new one, never a partial write,
+    and concurrent writers each use their own temp file.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
 
 
 def _load_lookup(path: str) -> dict:
     """Load ASIN lookup from JSON file. Returns empty dict if missing."""
     path = os.path.normpath(path)
-    if not os.path.exists(path):
+    # Open directly rather than checking exists first: no race with writers
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
         return {}
-    with open(path, "r") as f:
-        return json.load(f)
+    with f:
+        return json.loads(f.read())
+
+
+# Parsed lookups by normalized path: (mtime_ns, size, lookup, lookup_lower).
+# Entries are shared between calls and must not be mutated.
+_LOOKUP_CACHE = {}
+
+
+def _load_lookup_with_index(path: str) -> tuple[dict, dict]:
+    """Load a lookup plus its case-insensitive index, memoized per file version.
+
+    The index maps lowercase ASIN → title. Both dicts are
+    cached until the file's mtime or size changes; treat them as read-only.
+    """
+    path = os.path.normpath(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {}, {}
+    cached = _LOOKUP_CACHE.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2], cached[3]
+    lookup = _load_lookup(path)
+    lookup_lower = {k.lower(): v for k, v in lookup.items()}
+    _LOOKUP_CACHE[path] = (st.st_mtime_ns, st.st_size, lookup, lookup_lower)
+    return lookup, lookup_lower
 
 
 def _save_lookup(lookup: dict, path: str) -> None:
-    """Save updated lookup back to JSON file."""
+    """Save updated lookup back to JSON file, atomically."""
     path = os.path.normpath(path)
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(lookup, f, indent=2)
-        f.write("\n")
+    _replace_file(path, (json.dumps(lookup, indent=2) + "\n").encode("utf-8"))
+
+
+def _misses_path(lookup_path: str) -> str:
+    """Path of the failed-lookup sidecar that lives beside a lookup file."""
+    return os.path.join(os.path.dirname(os.path.normpath(lookup_path)), _MISSES_FILENAME)
 
 
 def _clean_title(raw: str) -> str | None:
@@ -73,27 +165,85 @@ def _clean_title(raw: str) -> str | None:
     # Decode HTML entities (&#x27; → ', &amp; → &, etc.)
     raw = html.unescape(raw)
     # Strip "Amazon.com: " prefix
-    raw = re.sub(r"^Amazon\.com:\s*", "", raw)
+    if raw.startswith("Amazon.com:"):
+        raw = raw[len("Amazon.com:"):].lstrip()
     # Reject if nothing left but "Amazon.com" (CAPTCHA / bot block page)
     if not raw or raw.strip().lower() in ("amazon.com", "page not found"):
         return None
     # Strip trailing ": Books" or ": Kindle Store" etc.
-    raw = re.sub(r"\s*:\s*(Books|Kindle Store)\s*$", "", raw)
+    raw = _STORE_SUFFIX_RE.sub("", raw)
     # Strip "Author, Name: ISBN: Amazon.com" suffix from <title> tags
     # Pattern: ": Author: 978...: Amazon.com" at end
-    raw = re.sub(r":\s*\d{13,}:\s*Amazon\.com\s*$", "", raw)
-    raw = re.sub(r"\s*:\s*Amazon\.com\s*$", "", raw)
+    raw = _ISBN_AMAZON_SUFFIX_RE.sub("", raw)
+    raw = _AMAZON_SUFFIX_RE.sub("", raw)
     # Strip "eBook : Author" suffix (Kindle titles)
-    raw = re.sub(r"\s*eBook\s*:\s*.+$", "", raw)
+    raw = _EBOOK_SUFFIX_RE.sub("", raw)
     # Strip author after last ": Author, Name" if it follows an ISBN-like pattern
     # But keep subtitles — only strip if what follows looks like "Lastname, First"
-    raw = re.sub(r":\s*[A-Z][a-z]+,\s*[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?\s*$", "", raw)
+    raw = _AUTHOR_SUFFIX_RE.sub("", raw)
     raw = raw.strip().rstrip(":")
     if not raw or raw.strip().lower() == "amazon.com":
         return None
     return raw
 
 
+def _drop_connection(key) -> None:
+    """Close and forget the pooled connection for key, if any."""
+    conn = _CONNECTIONS.pop(key, None)
+    if conn is not None:
+        conn.close()
+
+
+def _http_get(url: str, headers: dict) -> str | None:
+    """GET a page over a pooled keep-alive connection, following redirects.
+
+    Returns the decoded body, or None for an error status or too many
+    redirects. Network failures raise; the connection involved is dropped
+    so the next request starts fresh. Bodies are requested gzip-compressed.
+    """
+    headers = {**headers, "Accept-Encoding": "gzip"}
+    for _ in range(_MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        # A pooled connection may have been closed by the server while idle;
+        # retry once on a fresh one before giving up
+        for attempt in range(2):
+            reused = key in _CONNECTIONS
+            if not reused:
+                conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+                _CONNECTIONS[key] = conn_cls(parts.netloc, timeout=10)
+            conn = _CONNECTIONS[key]
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (http.client.HTTPException, OSError):
+                _drop_connection(key)
+                if not reused or attempt:
+                    raise
+            except Exception:
+                _drop_connection(key)
+                raise
+        if resp.will_close:
+            _drop_connection(key)
+
+        location = resp.getheader("Location")
+        if resp.status in (301, 302, 303, 307, 308) and location:
+            url = urllib.parse.urljoin(url, location)
+            continue
+        if resp.status >= 400:
+            return None
+        if (resp.getheader("Content-Encoding") or "").lower() == "gzip":
+            try:
+                body = gzip.decompress(body)
+            except (OSError, EOFError, zlib.error):
+                return None  # truncated or corrupt body
+        return body.decode("utf-8", errors="replace")
+    return None
+
+
 class _Timeout(Exception):
     pass
 
@@ -102,6 +252,16 @@ def _timeout_handler(signum, frame):
     raise _Timeout()
 
 
+def _search_from(pattern: re.Pattern, page: str, anchor: str) -> re.Match | None:
+    """Search page with pattern, starting at the first occurrence of anchor.
+
+    anchor is the literal every match begins with, so str.find skips the
+    bulk of a large page before the regex engine is entered.
+    """
+    start = page.find(anchor)
+    return pattern.search(page, start) if start >= 0 else None
+
+
 def _scrape_amazon_title(asin: str) -> str | None:
     """Attempt to scrape the product title from Amazon's product page.
 
@@ -111,23 +271,28 @@ def _scrape_amazon_title(asin: str) -> str | None:
     """
     url = f"https://www.amazon.com/dp/{asin.upper()}"
     ua = random.choice(_USER_AGENTS)
-    req = urllib.request.Request(url, headers={"User-Agent": ua})
 
     old_handler = signal.signal(signal.SIGALRM, _timeout_handler)
     signal.alarm(15)  # hard 15-second total timeout
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            page = resp.read().decode("utf-8", errors="replace")
+        page = _http_get(url, {"User-Agent": ua})
         signal.alarm(0)
+        if page is None:
+            return None
+        # Bot-check pages come back as 200s; they name themselves near the
+        # top, so give up on them before scanning the page
+        head = page[:_BOT_CHECK_HEAD]
+        if any(marker in head for marker in _BOT_CHECK_MARKERS):
+            return None
         # Try productTitle span first (most reliable when present)
-        pt_match = re.search(r'id="productTitle"[^>]*>(.*?)</span>', page, re.DOTALL)
+        pt_match = _search_from(_PRODUCT_TITLE_RE, page, 'id="productTitle"')
         if pt_match:
             return _clean_title(pt_match.group(1).strip())
         # Fallback: <title> tag
-        title_match = re.search(r"<title[^>]*>(.*?)</title>", page, re.DOTALL)
+        title_match = _search_from(_TITLE_TAG_RE, page, "<title")
         if title_match:
             return _clean_title(title_match.group(1).strip())
-    except (_Timeout, urllib.error.URLError, urllib.error.HTTPError, OSError):
+    except (_Timeout, http.client.HTTPException, OSError):
         pass
     finally:
         signal.alarm(0)
@@ -144,21 +309,20 @@ def _google_fallback_title(asin: str) -> str | None:
     query = urllib.parse.quote(f"amazon.com/dp/{asin.upper()}")
     url = f"https://www.google.com/search?q={query}"
     ua = random.choice(_USER_AGENTS)
-    req = urllib.request.Request(url, headers={"User-Agent": ua})
 
     old_handler = signal.signal(signal.SIGALRM, _timeout_handler)
     signal.alarm(15)
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            page = resp.read().decode("utf-8", errors="replace")
+        page = _http_get(url, {"User-Agent": ua})
         signal.alarm(0)
+        if page is None:
+            return None
 
         # Google wraps result titles in <h3> tags; the first one matching
         # an Amazon-like pattern is our best bet
-        h3_matches = re.findall(r"<h3[^>]*>(.*?)</h3>", page, re.DOTALL)
-        for h3 in h3_matches:
+        for h3 in _H3_RE.finditer(page):
             # Strip HTML tags from the h3 content
-            text = re.sub(r"<[^>]+>", "", h3).strip()
+            text = _TAG_RE.sub("", h3.group(1)).strip()
             text = html.unescape(text)
             # Skip results that are clearly not product titles
             if not text or "amazon" in text.lower() and len(text) < 15:
@@ -169,17 +333,13 @@ def _google_fallback_title(asin: str) -> str | None:
 
         # Fallback: try <title>-style patterns in result snippets
         # Google sometimes puts the title in span/div with specific classes
-        snippet_matches = re.findall(
-            r'(?:aria-level="3"|role="heading")[^>]*>(.*?)</(?:span|div|h3)',
-            page, re.DOTALL,
-        )
-        for snippet in snippet_matches:
-            text = re.sub(r"<[^>]+>", "", snippet).strip()
+        for snippet in _HEADING_SNIPPET_RE.finditer(page):
+            text = _TAG_RE.sub("", snippet.group(1)).strip()
             text = html.unescape(text)
             cleaned = _clean_title(text)
             if cleaned:
                 return cleaned
-    except (_Timeout, urllib.error.URLError, urllib.error.HTTPError, OSError):
+    except (_Timeout, http.client.HTTPException, OSError):
         pass
     finally:
         signal.alarm(0)
@@ -191,6 +351,7 @@ def resolve_asins(
     terms: list[str],
     lookup_path: str | None = None,
     scrape: bool = True,
+    retry_failed: bool = False,
 ) -> dict[str, str]:
     """Resolve a list of search terms, returning a mapping for ASIN terms.
 
@@ -198,6 +359,8 @@ def resolve_asins(
         terms: List of raw search term strings.
         lookup_path: Path to asin_lookup.json. Uses default if None.
         scrape: Whether to attempt Amazon scraping for unknown ASINs.
+        retry_failed: Scrape ASINs that failed within the last 30 days too.
+            By default those are reported as unknown without a request.
 
     Returns:
         Dict mapping original search term → display name.
@@ -207,25 +370,40 @@ def resolve_asins(
     if lookup_path is None:
         lookup_path = _DEFAULT_LOOKUP_PATH
 
-    lookup = _load_lookup(lookup_path)
-    # Build case-insensitive index: lowercase ASIN → (canonical ASIN, title)
-    lookup_lower = {k.lower(): (k, v) for k, v in lookup.items()}
+    # Repeated terms share one result entry, so resolve (and scrape) each
+    # distinct ASIN term once, in first-seen order
+    asin_terms = [term for term in dict.fromkeys(terms) if is_asin(term)]
+    if not asin_terms:
+        return {}
+
+    # Case-insensitive index: lowercase ASIN → title
+    lookup, lookup_lower = _load_lookup_with_index(lookup_path)
 
     result = {}
     newly_resolved = {}
     unknown_asins = []
 
-    for term in terms:
-        if not is_asin(term):
-            continue
-
+    for term in asin_terms:
         term_lower = term.strip().lower()
         if term_lower in lookup_lower:
-            canonical, title = lookup_lower[term_lower]
-            result[term] = f"{title} ({term})"
+            result[term] = f"{lookup_lower[term_lower]} ({term})"
         else:
             unknown_asins.append(term)
 
+    # Skip ASINs that recently failed to resolve (see _MISS_TTL)
+    misses_path = _misses_path(lookup_path)
+    misses = _load_lookup(misses_path) if scrape and unknown_asins else {}
+    if misses and not retry_failed:
+        now = time.time()
+        to_scrape = []
+        for asin in unknown_asins:
+            if now - misses.get(asin.strip().lower(), 0) < _MISS_TTL:
+                result[asin] = f"{asin} (unknown)"
+            else:
+                to_scrape.append(asin)
+        unknown_asins = to_scrape
+    misses_changed = False
+
     # Scrape unknown ASINs
     if scrape and unknown_asins:
         import sys
@@ -233,10 +411,15 @@ def resolve_asins(
         consecutive_failures = 0
         total_backoff_used = 0.0
         print(f"  Resolving {total} unknown ASINs...", file=sys.stderr)
+        # Pace request starts rather than idle gaps: the jittered delay runs
+        # from when the previous ASIN's request began, so its fetch and parse
+        # time count toward the wait instead of adding to it
+        next_request_at = 0.0
         for i, asin in enumerate(unknown_asins):
-            if i > 0:
-                delay = random.uniform(_DELAY_MIN, _DELAY_MAX)
-                time.sleep(delay)
+            wait = next_request_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            next_request_at = time.monotonic() + random.uniform(_DELAY_MIN, _DELAY_MAX)
             print(f"    [{i+1}/{total}] {asin}...", end="", file=sys.stderr, flush=True)
 
             # Try Amazon direct scrape first
@@ -253,11 +436,14 @@ def resolve_asins(
                 result[asin] = f"{title} ({asin})"
                 canonical = asin.upper() if asin[0].lower() == "b" else asin
                 newly_resolved[canonical] = title
+                misses_changed |= misses.pop(asin.strip().lower(), None) is not None
                 consecutive_failures = 0
                 label = " OK" if source == "amazon" else " OK (google)"
                 print(label, file=sys.stderr)
             else:
                 result[asin] = f"{asin} (unknown)"
+                misses[asin.strip().lower()] = int(time.time())
+                misses_changed = True
                 consecutive_failures += 1
                 print(f" failed", file=sys.stderr)
 
@@ -286,9 +472,12 @@ def resolve_asins(
                     time.sleep(backoff)
 
     # Persist newly scraped titles
-    if newly_resolved:
-        lookup.update(newly_resolved)
-        _save_lookup(lookup, lookup_path)
+    # Only rewrite the file when a title is actually new or different
+    if any(lookup.get(k) != v for k, v in newly_resolved.items()):
+        # Merge into a copy: the loaded dict is shared with the lookup cache
+        _save_lookup({**lookup, **newly_resolved}, lookup_path)
+    if misses_changed:
+        _save_lookup(misses, misses_path)
 
     return result
 
@@ -308,6 +497,7 @@ def retry_unknown_asins(
         terms=unknown_asins,
         lookup_path=lookup_path,
         scrape=True,
+        retry_failed=True,
     )
     # Return only the ones that resolved to actual titles (not "unknown")
     return {
@@ -0,0 +1,61 @@
+"""Precomputed lookups derived from the campaign config.
+
+Several analyzers need the same views of campaigns.yaml (which campaigns are
+product vs keyword targeting, ASIN → title lookup, which ASINs belong to which
+book). Building them once per report and passing the result through avoids
+re-scanning the config in each analyzer.
+"""
+
+
+def build_config_index(config: dict) -> dict:
+    """Build campaign/target lookups from the config in a single pass.
+
+    Only active targets (``targets``) are indexed; paused targets are
+    excluded so they never trigger zero-activity flags.
+
+    Returns:
+        dict with keys:
+            - campaigns_by_type: {campaign type: frozenset of campaign names}
+            - asin_campaigns: frozenset of product_targeting campaign names
+            - keyword_campaigns: frozenset of keyword_targeting campaign names
+            - target_lookup: {asin: {"title", "campaign_key"}} for product
+              targeting targets. If an ASIN is listed more than once
+              (exact + expanded), the last entry wins.
+            - book_roles: {asin: "Book 1" | "Book 2"} for the series books
+              Kindle and paperback ASINs. An ASIN listed under both books
+              maps to "Book 1".
+    """
+    campaigns_by_type = {}
+    target_lookup = {}
+
+    for key, campaign in config.get("campaigns", {}).items():
+        campaign_type = campaign.get("type")
+        if "name" in campaign:
+            campaigns_by_type.setdefault(campaign_type, set()).add(campaign["name"])
+        if campaign_type == "product_targeting":
+            for target in campaign.get("targets", []):
+                target_lookup[target["asin"]] = {
+                    "title": target.get("title", ""),
+                    "campaign_key": key,
+                }
+    campaigns_by_type = {t: frozenset(names) for t, names in campaigns_by_type.items()}
+
+    book1_asins = set()
+    book2_asins = set()
+    for key, book in config.get("books", {}).items():
+        asins = {book.get("asin_kindle", ""), book.get("asin_paperback", "")} - {""}
+        if "book_1" in key or "Book 1" in book.get("short_title", ""):
+            book1_asins.update(asins)
+        elif "book_2" in key or "Book 2" in book.get("short_title", ""):
+            book2_asins.update(asins)
+
+    book_roles = {asin: "Book 2" for asin in book2_asins}
+    book_roles.update({asin: "Book 1" for asin in book1_asins})
+
+    return {
+        "campaigns_by_type": campaigns_by_type,
+        "asin_campaigns": campaigns_by_type.get("product_targeting", frozenset()),
+        "keyword_campaigns": campaigns_by_type.get("keyword_targeting", frozenset()),
+        "target_lookup": target_lookup,
+        "book_roles": book_roles,
+    }